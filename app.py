@@ -6,13 +6,24 @@ from PySide6.QtWidgets import (
     QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
     QPushButton, QLabel, QSlider, QComboBox, QFileDialog, QSpinBox,
     QGroupBox, QColorDialog, QFontDialog, QCheckBox, QTabWidget,
-    QListWidget, QMessageBox, QProgressBar, QFrame, QTextEdit,
+    QListWidget, QMessageBox, QProgressBar, QFrame, QPlainTextEdit,
     QLineEdit, QRadioButton, QButtonGroup, QScrollArea
 )
-from PySide6.QtCore import Qt, QThread, Signal, QTimer, QSize
-from PySide6.QtGui import QFont, QColor, QPixmap, QIcon, QPalette
+from PySide6.QtCore import (
+    Qt, QThread, Signal, Slot, QTimer, QSize, QObject, QRunnable, QThreadPool,
+    QRect, QPoint, QSignalBlocker
+)
+from PySide6.QtGui import (
+    QFont, QColor, QPixmap, QIcon, QPalette, QPainter, QImage, QImageReader,
+    QPixmapCache
+)
 import datetime
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 # Import your engine (assuming it's in the same directory)
 try:
     from windows_wallpaper_engin import MultiLayerDepthEngine
@@ -21,10 +32,213 @@ except ImportError:
     print("Make sure windows_wallpaper_engin_2.py is in the same directory")
     sys.exit(1)
 
+# Control panel tab indices
+TAB_IMAGE, TAB_CLOCK, TAB_APPEARANCE, TAB_ADVANCED = range(4)
+
+# Combo box entries mapped to the strftime format they select
+CLOCK_FORMATS = {
+    "%H:%M (24-hour)": "%H:%M",
+    "%I:%M %p (12-hour)": "%I:%M %p",
+    "%H:%M:%S (with seconds)": "%H:%M:%S",
+}
+DATE_FORMATS = {
+    "%a %b %d (Mon Jan 27)": "%a %b %d",
+    "%A, %B %d (Monday, January 27)": "%A, %B %d",
+    "%d/%m/%Y (27/01/2026)": "%d/%m/%Y",
+    "%B %d, %Y (January 27, 2026)": "%B %d, %Y",
+}
+
+
+# Application stylesheet, parsed by Qt once when the window is created
+STYLESHEET = """
+    QMainWindow {
+        background-color: #1e1e1e;
+    }
+    QWidget {
+        background-color: #1e1e1e;
+        color: #e0e0e0;
+        font-family: 'Segoe UI', Arial, sans-serif;
+        font-size: 13px;
+    }
+    QGroupBox {
+        font-weight: bold;
+        border: 2px solid #3a3a3a;
+        border-radius: 6px;
+        margin-top: 12px;
+        padding-top: 10px;
+    }
+    QGroupBox::title {
+        subcontrol-origin: margin;
+        left: 10px;
+        padding: 0 5px;
+    }
+    QPushButton {
+        background-color: #3a3a3a;
+        border: 1px solid #555;
+        border-radius: 4px;
+        padding: 8px 16px;
+        color: #e0e0e0;
+    }
+    QPushButton:hover {
+        background-color: #4a4a4a;
+        border: 1px solid #666;
+    }
+    QPushButton:pressed {
+        background-color: #2a2a2a;
+    }
+    QPushButton:disabled {
+        background-color: #252525;
+        color: #666;
+    }
+    QLineEdit, QSpinBox, QComboBox {
+        background-color: #2b2b2b;
+        border: 1px solid #3a3a3a;
+        border-radius: 4px;
+        padding: 6px;
+        color: #e0e0e0;
+    }
+    QLineEdit:focus, QSpinBox:focus, QComboBox:focus {
+        border: 1px solid #2196F3;
+    }
+    QSlider::groove:horizontal {
+        height: 6px;
+        background: #3a3a3a;
+        border-radius: 3px;
+    }
+    QSlider::handle:horizontal {
+        background: #2196F3;
+        width: 16px;
+        margin: -5px 0;
+        border-radius: 8px;
+    }
+    QSlider::handle:horizontal:hover {
+        background: #42A5F5;
+    }
+    QTabWidget::pane {
+        border: 1px solid #3a3a3a;
+        border-radius: 4px;
+        background-color: #1e1e1e;
+    }
+    QTabBar::tab {
+        background-color: #2b2b2b;
+        border: 1px solid #3a3a3a;
+        padding: 8px 16px;
+        margin-right: 2px;
+    }
+    QTabBar::tab:selected {
+        background-color: #3a3a3a;
+        border-bottom-color: #3a3a3a;
+    }
+    QTabBar::tab:hover {
+        background-color: #4a4a4a;
+    }
+    QListWidget {
+        background-color: #2b2b2b;
+        border: 1px solid #3a3a3a;
+        border-radius: 4px;
+    }
+    QListWidget::item:selected {
+        background-color: #2196F3;
+    }
+    QListWidget::item:hover {
+        background-color: #3a3a3a;
+    }
+    QPlainTextEdit {
+        background-color: #2b2b2b;
+        border: 1px solid #3a3a3a;
+        border-radius: 4px;
+        padding: 8px;
+    }
+    QCheckBox {
+        spacing: 8px;
+    }
+    QCheckBox::indicator {
+        width: 18px;
+        height: 18px;
+        border: 2px solid #3a3a3a;
+        border-radius: 3px;
+        background-color: #2b2b2b;
+    }
+    QCheckBox::indicator:checked {
+        background-color: #2196F3;
+        border-color: #2196F3;
+    }
+    QProgressBar {
+        border: 1px solid #3a3a3a;
+        border-radius: 4px;
+        text-align: center;
+        background-color: #2b2b2b;
+    }
+    QProgressBar::chunk {
+        background-color: #2196F3;
+        border-radius: 3px;
+    }
+    QScrollArea {
+        border: none;
+    }
+    QScrollBar:vertical {
+        background: #2b2b2b;
+        width: 12px;
+        border-radius: 6px;
+    }
+    QScrollBar::handle:vertical {
+        background: #3a3a3a;
+        border-radius: 6px;
+        min-height: 20px;
+    }
+    QScrollBar::handle:vertical:hover {
+        background: #4a4a4a;
+    }
+    QPushButton#btnInitialize, QPushButton#btnStart, QPushButton#btnStop {
+        color: white;
+        padding: 10px;
+        font-weight: bold;
+    }
+    QPushButton#btnInitialize {
+        background-color: #2196F3;
+    }
+    QPushButton#btnStart {
+        background-color: #4CAF50;
+    }
+    QPushButton#btnStop {
+        background-color: #F44336;
+    }
+    """
+
+
+def load_json(data):
+    """Parse JSON bytes, using orjson when it is installed"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def dump_json(obj, indent=True):
+    """Serialize to JSON bytes, using orjson when it is installed"""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if indent else None)
+    return json.dumps(obj, indent=4 if indent else None).encode("utf-8")
+
+
+def set_value_silently(widget, value):
+    """setValue() without emitting valueChanged"""
+    with QSignalBlocker(widget):
+        widget.setValue(value)
+
+
+def pil_to_qimage(image):
+    """Convert a PIL image to a QImage that owns its pixel data"""
+    image = image.convert("RGBA")
+    data = image.tobytes("raw", "RGBA")
+    width, height = image.size
+    # copy() detaches from `data`, which is freed when this function returns
+    return QImage(data, width, height, width * 4, QImage.Format_RGBA8888).copy()
+
 
 class EngineWorker(QThread):
     """Worker thread for AI processing to keep UI responsive"""
     progress = Signal(str)
+    frame_ready = Signal(QImage)
     finished = Signal(bool, str)
     
     def __init__(self, engine):
@@ -35,28 +249,94 @@ class EngineWorker(QThread):
         try:
             self.progress.emit("Initializing engine...")
             self.engine.initialize()
+            if self.engine.use_jit:
+                self.progress.emit("Compiling kernels...")
+                self.engine.warmup()
+            self.progress.emit("Rendering first frame...")
+            self.frame_ready.emit(pil_to_qimage(self.engine.create_wallpaper_frame()))
             self.finished.emit(True, "Engine initialized successfully!")
         except Exception as e:
             self.finished.emit(False, f"Error: {str(e)}")
 
 
+class PreviewLoaderSignals(QObject):
+    """Signals for PreviewLoader (QRunnable is not a QObject)"""
+    loaded = Signal(str, QImage)
+
+
+class PreviewLoader(QRunnable):
+    """Decodes the wallpaper file in the thread pool.
+
+    QImage is safe to create outside the GUI thread (QPixmap is not),
+    so the slot receiving `loaded` does the QPixmap conversion. Images
+    larger than max_size are downscaled by the decoder itself, so a 4K
+    wallpaper is never decoded at full resolution just to be shrunk.
+    """
+    def __init__(self, key, path, max_size):
+        super().__init__()
+        self.key = key
+        self.path = path
+        self.max_size = max_size
+        self.signals = PreviewLoaderSignals()
+
+    def run(self):
+        reader = QImageReader(str(self.path))
+        reader.setAutoTransform(True)
+        size = reader.size()
+        if size.isValid() and (
+            size.width() > self.max_size.width() or size.height() > self.max_size.height()
+        ):
+            reader.setScaledSize(size.scaled(self.max_size, Qt.KeepAspectRatio))
+        self.signals.loaded.emit(self.key, reader.read())
+
+
 class PreviewWidget(QLabel):
     """Custom widget to display wallpaper preview"""
     def __init__(self):
         super().__init__()
         self.setMinimumSize(400, 300)
         self.setMaximumSize(800, 600)
-        self.setScaledContents(True)
         self.setFrameStyle(QFrame.Box | QFrame.Sunken)
         self.setAlignment(Qt.AlignCenter)
         self.setText("No preview available")
         self.setStyleSheet("background-color: #2b2b2b; color: #888;")
+        self._pixmap = None
+        self._scaled = None
+
+    def set_preview(self, pixmap):
+        """Show a pixmap; it is downscaled once and reused until resized"""
+        self._pixmap = pixmap
+        self._scaled = None
+        self.setText("")
+        self.update()
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        if event.size() != event.oldSize():
+            self._scaled = None
+
+    def paintEvent(self, event):
+        super().paintEvent(event)
+        if self._pixmap is None or self._pixmap.isNull():
+            return
+        area = self.contentsRect()
+        if self._scaled is None:
+            self._scaled = self._pixmap.scaled(
+                area.size(), Qt.KeepAspectRatio, Qt.SmoothTransformation
+            )
+        target = QRect(QPoint(0, 0), self._scaled.size())
+        target.moveCenter(area.center())
+        painter = QPainter(self)
+        painter.drawPixmap(target.topLeft(), self._scaled)
+        painter.end()
 
 
 class DepthWallpaperGUI(QMainWindow):
     def __init__(self):
         super().__init__()
         self.engine = None
+        self._preview_key = None
+        self._file_dialogs = {}
         self.config_file = Path("wallpaper_config.json")
         self.default_config = {
             "image_path": "",
@@ -75,9 +355,27 @@ class DepthWallpaperGUI(QMainWindow):
             "date_format": "%a %b %d",
             "clock_position_x": 50,  # percentage
             "clock_position_y": 25,  # percentage
-            "auto_start": False
+            "auto_start": False,
+            "use_jit": True
         }
         self.config = self.load_config()
+
+        # Slider value labels share one timer and refresh at most ~30 times
+        # a second, however many sliders are being dragged
+        self._live_labels = []  # (slider, label, suffix)
+        self._last_values = {}
+        self._label_timer = QTimer(self)
+        self._label_timer.setSingleShot(True)
+        self._label_timer.setInterval(33)
+        self._label_timer.timeout.connect(self.refresh_labels)
+
+        # Bursts of setting changes are written to disk once, 500 ms after
+        # the last one
+        self._save_timer = QTimer(self)
+        self._save_timer.setSingleShot(True)
+        self._save_timer.setInterval(500)
+        self._save_timer.timeout.connect(self.save_config)
+
         self.init_ui()
         self.load_saved_settings()
         
@@ -113,19 +411,25 @@ class DepthWallpaperGUI(QMainWindow):
         
         # Tab widget for organized controls
         tabs = QTabWidget()
-        
+        self.tabs = tabs
+
         # Tab 1: Image & Layers
         tabs.addTab(self.create_image_tab(), "Image & Layers")
-        
-        # Tab 2: Clock Settings
-        tabs.addTab(self.create_clock_tab(), "Clock & Date")
-        
-        # Tab 3: Appearance
-        tabs.addTab(self.create_appearance_tab(), "Appearance")
-        
-        # Tab 4: Advanced
-        tabs.addTab(self.create_advanced_tab(), "Advanced")
-        
+
+        # Tabs 2-4 (Clock Settings, Appearance, Advanced) are built the
+        # first time they are opened
+        self._tab_builders = {
+            TAB_CLOCK: self.create_clock_tab,
+            TAB_APPEARANCE: self.create_appearance_tab,
+            TAB_ADVANCED: self.create_advanced_tab,
+        }
+        self._tab_built = [True, False, False, False]
+        for title in ("Clock & Date", "Appearance", "Advanced"):
+            placeholder = QWidget()
+            QVBoxLayout(placeholder).setContentsMargins(0, 0, 0, 0)
+            tabs.addTab(placeholder, title)
+        tabs.currentChanged.connect(self.ensure_tab_built)
+
         layout.addWidget(tabs)
         
         # Bottom control buttons
@@ -134,7 +438,15 @@ class DepthWallpaperGUI(QMainWindow):
         
         scroll.setWidget(container)
         return scroll
-        
+
+    def ensure_tab_built(self, index):
+        """Build a deferred tab into its placeholder on first use"""
+        if index < 0 or self._tab_built[index]:
+            return
+        self._tab_built[index] = True
+        # The builders read their initial values from self.config
+        self.tabs.widget(index).layout().addWidget(self._tab_builders[index]())
+
     def create_image_tab(self):
         """Image selection and layer configuration"""
         widget = QWidget()
@@ -174,6 +486,7 @@ class DepthWallpaperGUI(QMainWindow):
         layer_layout.addWidget(QLabel("Clock Depth Position:"))
         self.layer_list = QListWidget()
         self.layer_list.setMaximumHeight(150)
+        self.layer_list.itemClicked.connect(self.on_layer_selected)
         layer_layout.addWidget(self.layer_list)
         
         layer_info = QLabel("Select which depth layer should display the clock.\n"
@@ -201,11 +514,7 @@ class DepthWallpaperGUI(QMainWindow):
         format_h = QHBoxLayout()
         format_h.addWidget(QLabel("Time Format:"))
         self.clock_format_combo = QComboBox()
-        self.clock_format_combo.addItems([
-            "%H:%M (24-hour)",
-            "%I:%M %p (12-hour)",
-            "%H:%M:%S (with seconds)"
-        ])
+        self.clock_format_combo.addItems(list(CLOCK_FORMATS))
         format_h.addWidget(self.clock_format_combo)
         time_layout.addLayout(format_h)
         
@@ -215,6 +524,10 @@ class DepthWallpaperGUI(QMainWindow):
         self.custom_format_input = QLineEdit()
         self.custom_format_input.setPlaceholderText("e.g., %H:%M")
         custom_h.addWidget(self.custom_format_input)
+        self.set_format_controls(
+            self.clock_format_combo, CLOCK_FORMATS, self.config.get("clock_format", "%H:%M"),
+            self.custom_format_input
+        )
         time_layout.addLayout(custom_h)
         
         time_group.setLayout(time_layout)
@@ -231,13 +544,11 @@ class DepthWallpaperGUI(QMainWindow):
         date_format_h = QHBoxLayout()
         date_format_h.addWidget(QLabel("Date Format:"))
         self.date_format_combo = QComboBox()
-        self.date_format_combo.addItems([
-            "%a %b %d (Mon Jan 27)",
-            "%A, %B %d (Monday, January 27)",
-            "%d/%m/%Y (27/01/2026)",
-            "%B %d, %Y (January 27, 2026)"
-        ])
+        self.date_format_combo.addItems(list(DATE_FORMATS))
         date_format_h.addWidget(self.date_format_combo)
+        self.set_format_controls(
+            self.date_format_combo, DATE_FORMATS, self.config.get("date_format", "%a %b %d")
+        )
         date_layout.addLayout(date_format_h)
         
         date_group.setLayout(date_layout)
@@ -254,9 +565,7 @@ class DepthWallpaperGUI(QMainWindow):
         self.h_pos_slider.setRange(0, 100)
         self.h_pos_slider.setValue(self.config.get("clock_position_x", 50))
         self.h_pos_label = QLabel(f"{self.h_pos_slider.value()}%")
-        self.h_pos_slider.valueChanged.connect(
-            lambda v: self.h_pos_label.setText(f"{v}%")
-        )
+        self.add_live_label(self.h_pos_slider, self.h_pos_label, "%")
         h_pos_layout.addWidget(self.h_pos_slider)
         h_pos_layout.addWidget(self.h_pos_label)
         pos_layout.addLayout(h_pos_layout)
@@ -268,9 +577,7 @@ class DepthWallpaperGUI(QMainWindow):
         self.v_pos_slider.setRange(0, 100)
         self.v_pos_slider.setValue(self.config.get("clock_position_y", 25))
         self.v_pos_label = QLabel(f"{self.v_pos_slider.value()}%")
-        self.v_pos_slider.valueChanged.connect(
-            lambda v: self.v_pos_label.setText(f"{v}%")
-        )
+        self.add_live_label(self.v_pos_slider, self.v_pos_label, "%")
         v_pos_layout.addWidget(self.v_pos_slider)
         v_pos_layout.addWidget(self.v_pos_label)
         pos_layout.addLayout(v_pos_layout)
@@ -293,6 +600,8 @@ class DepthWallpaperGUI(QMainWindow):
         # Font selection
         font_btn_layout = QHBoxLayout()
         self.font_path_label = QLabel("System Default Font")
+        if self.config.get("font_path"):
+            self.font_path_label.setText(os.path.basename(self.config["font_path"]))
         font_btn_layout.addWidget(self.font_path_label)
         btn_select_font = QPushButton("Select Font")
         btn_select_font.clicked.connect(self.select_font)
@@ -306,9 +615,7 @@ class DepthWallpaperGUI(QMainWindow):
         self.font_size_slider.setRange(50, 300)
         self.font_size_slider.setValue(self.config.get("font_size", 150))
         self.font_size_label = QLabel(f"{self.font_size_slider.value()}px")
-        self.font_size_slider.valueChanged.connect(
-            lambda v: self.font_size_label.setText(f"{v}px")
-        )
+        self.add_live_label(self.font_size_slider, self.font_size_label, "px")
         size_layout.addWidget(self.font_size_slider)
         size_layout.addWidget(self.font_size_label)
         font_layout.addLayout(size_layout)
@@ -320,9 +627,7 @@ class DepthWallpaperGUI(QMainWindow):
         self.date_size_slider.setRange(10, 100)
         self.date_size_slider.setValue(self.config.get("date_font_size", 30))
         self.date_size_label = QLabel(f"{self.date_size_slider.value()}px")
-        self.date_size_slider.valueChanged.connect(
-            lambda v: self.date_size_label.setText(f"{v}px")
-        )
+        self.add_live_label(self.date_size_slider, self.date_size_label, "px")
         date_size_layout.addWidget(self.date_size_slider)
         date_size_layout.addWidget(self.date_size_label)
         font_layout.addLayout(date_size_layout)
@@ -363,9 +668,7 @@ class DepthWallpaperGUI(QMainWindow):
         self.shadow_opacity_slider.setRange(0, 255)
         self.shadow_opacity_slider.setValue(self.config.get("shadow_opacity", 120))
         self.shadow_opacity_label = QLabel(f"{self.shadow_opacity_slider.value()}")
-        self.shadow_opacity_slider.valueChanged.connect(
-            lambda v: self.shadow_opacity_label.setText(str(v))
-        )
+        self.add_live_label(self.shadow_opacity_slider, self.shadow_opacity_label)
         opacity_layout.addWidget(self.shadow_opacity_slider)
         opacity_layout.addWidget(self.shadow_opacity_label)
         color_layout.addLayout(opacity_layout)
@@ -408,6 +711,10 @@ class DepthWallpaperGUI(QMainWindow):
         self.auto_start_check = QCheckBox("Auto-start engine on launch")
         self.auto_start_check.setChecked(self.config.get("auto_start", False))
         update_layout.addWidget(self.auto_start_check)
+
+        self.use_jit_check = QCheckBox("Use Numba JIT for composition")
+        self.use_jit_check.setChecked(self.config.get("use_jit", True))
+        update_layout.addWidget(self.use_jit_check)
         
         update_group.setLayout(update_layout)
         layout.addWidget(update_group)
@@ -457,8 +764,9 @@ class DepthWallpaperGUI(QMainWindow):
         status_group = QGroupBox("Status & Logs")
         status_layout = QVBoxLayout()
         
-        self.status_text = QTextEdit()
+        self.status_text = QPlainTextEdit()
         self.status_text.setReadOnly(True)
+        self.status_text.setMaximumBlockCount(500)
         self.status_text.setMaximumHeight(150)
         status_layout.addWidget(self.status_text)
         
@@ -480,25 +788,19 @@ class DepthWallpaperGUI(QMainWindow):
         
         self.btn_initialize = QPushButton("⚙️ Initialize Engine")
         self.btn_initialize.clicked.connect(self.initialize_engine)
-        self.btn_initialize.setStyleSheet(
-            "QPushButton { background-color: #2196F3; color: white; padding: 10px; font-weight: bold; }"
-        )
+        self.btn_initialize.setObjectName("btnInitialize")
         btn_layout.addWidget(self.btn_initialize)
         
         self.btn_start = QPushButton("▶️ Start Engine")
         self.btn_start.clicked.connect(self.start_engine)
         self.btn_start.setEnabled(False)
-        self.btn_start.setStyleSheet(
-            "QPushButton { background-color: #4CAF50; color: white; padding: 10px; font-weight: bold; }"
-        )
+        self.btn_start.setObjectName("btnStart")
         btn_layout.addWidget(self.btn_start)
         
         self.btn_stop = QPushButton("⏹️ Stop Engine")
         self.btn_stop.clicked.connect(self.stop_engine)
         self.btn_stop.setEnabled(False)
-        self.btn_stop.setStyleSheet(
-            "QPushButton { background-color: #F44336; color: white; padding: 10px; font-weight: bold; }"
-        )
+        self.btn_stop.setObjectName("btnStop")
         btn_layout.addWidget(self.btn_stop)
         
         layout.addLayout(btn_layout)
@@ -511,25 +813,42 @@ class DepthWallpaperGUI(QMainWindow):
         return group
         
     # Event handlers
+    def run_file_dialog(self, caption, name_filter, save=False):
+        """Show a file dialog and return the chosen path ("" if cancelled)
+
+        One dialog is kept per caption and reused, so later opens skip the
+        native picker setup and start in the last visited directory.
+        """
+        dialog = self._file_dialogs.get(caption)
+        if dialog is None:
+            dialog = QFileDialog(self, caption, "", name_filter)
+            if save:
+                dialog.setAcceptMode(QFileDialog.AcceptSave)
+                dialog.setDefaultSuffix("json")
+            else:
+                dialog.setFileMode(QFileDialog.ExistingFile)
+            self._file_dialogs[caption] = dialog
+        if not dialog.exec():
+            return ""
+        return dialog.selectedFiles()[0]
+
     def select_image(self):
-        file_path, _ = QFileDialog.getOpenFileName(
-            self, "Select Background Image", "",
-            "Image Files (*.png *.jpg *.jpeg *.bmp)"
+        file_path = self.run_file_dialog(
+            "Select Background Image", "Image Files (*.png *.jpg *.jpeg *.bmp)"
         )
         if file_path:
             self.config["image_path"] = file_path
-            self.image_path_label.setText(Path(file_path).name)
-            self.log(f"Selected image: {Path(file_path).name}")
+            name = os.path.basename(file_path)
+            self.image_path_label.setText(name)
+            self.log(f"Selected image: {name}")
             
     def select_font(self):
-        file_path, _ = QFileDialog.getOpenFileName(
-            self, "Select Font File", "",
-            "Font Files (*.ttf *.otf)"
-        )
+        file_path = self.run_file_dialog("Select Font File", "Font Files (*.ttf *.otf)")
         if file_path:
             self.config["font_path"] = file_path
-            self.font_path_label.setText(Path(file_path).name)
-            self.log(f"Selected font: {Path(file_path).name}")
+            name = os.path.basename(file_path)
+            self.font_path_label.setText(name)
+            self.log(f"Selected font: {name}")
             
     def select_font_color(self):
         color = QColorDialog.getColor(self.font_color, self, "Select Text Color")
@@ -545,6 +864,48 @@ class DepthWallpaperGUI(QMainWindow):
             self.update_color_button(self.shadow_color_btn, color)
             self.config["shadow_color"] = color.name()
             
+    def set_format_controls(self, combo, formats, fmt, custom_input=None):
+        """Select the preset for fmt, or show it in the custom field"""
+        for label, preset in formats.items():
+            if preset == fmt:
+                combo.setCurrentText(label)
+                if custom_input is not None:
+                    custom_input.clear()
+                return
+        if custom_input is not None:
+            custom_input.setText(fmt)
+
+    def read_format(self, combo, formats, custom_input=None):
+        """Return the selected strftime format, or None if it is invalid"""
+        fmt = custom_input.text().strip() if custom_input is not None else ""
+        fmt = fmt or formats[combo.currentText()]
+        try:
+            datetime.datetime.now().strftime(fmt)
+        except ValueError as e:
+            self.log(f"Invalid format '{fmt}': {e}")
+            return None
+        return fmt
+
+    def add_live_label(self, slider, label, suffix=""):
+        """Keep `label` showing the value of `slider` followed by `suffix`"""
+        self._live_labels.append((slider, label, suffix))
+        self._last_values[slider] = slider.value()
+        slider.valueChanged.connect(self.schedule_label_refresh)
+
+    @Slot()
+    def schedule_label_refresh(self):
+        if not self._label_timer.isActive():
+            self._label_timer.start()
+
+    @Slot()
+    def refresh_labels(self):
+        """Update the label of every slider whose value changed since last time"""
+        for slider, label, suffix in self._live_labels:
+            value = slider.value()
+            if self._last_values.get(slider) != value:
+                self._last_values[slider] = value
+                label.setText(f"{value}{suffix}")
+
     def update_color_button(self, button, color):
         button.setStyleSheet(
             f"QPushButton {{ background-color: {color.name()}; "
@@ -567,12 +928,16 @@ class DepthWallpaperGUI(QMainWindow):
             image_path=self.config["image_path"],
             font_path=self.config.get("font_path"),
             update_interval=self.config["update_interval"],
-            num_layers=self.config["num_layers"]
+            num_layers=self.config["num_layers"],
+            use_jit=self.config.get("use_jit", True)
         )
+        self.engine.clock_format = self.config["clock_format"]
+        self.engine.date_format = self.config["date_format"]
         
         # Start worker thread
         self.worker = EngineWorker(self.engine)
         self.worker.progress.connect(self.log)
+        self.worker.frame_ready.connect(self.on_frame_ready)
         self.worker.finished.connect(self.on_engine_initialized)
         self.worker.start()
         
@@ -589,19 +954,30 @@ class DepthWallpaperGUI(QMainWindow):
             self.log(f"Error: {message}")
             QMessageBox.critical(self, "Error", message)
             
+    @Slot(QImage)
+    def on_frame_ready(self, image):
+        """Show the first rendered frame without reading it back from disk"""
+        pixmap = QPixmap.fromImage(image)
+        path = self.engine.wallpaper_path
+        self._preview_key = f"{path}:{path.stat().st_mtime}"
+        QPixmapCache.insert(self._preview_key, pixmap)
+        self.preview_widget.set_preview(pixmap)
+        self.log("Preview updated")
+            
     def update_layer_list(self):
         """Update the layer selection list"""
         if not self.engine or not self.engine.layers:
             return
             
-        self.layer_list.clear()
-        for i, layer_data in enumerate(self.engine.layers):
-            item_text = f"Layer {i+1}: {layer_data['name']}"
-            self.layer_list.addItem(item_text)
-            
-        # Select current clock layer
-        self.layer_list.setCurrentRow(self.config.get("clock_layer", 2))
-        self.layer_list.itemClicked.connect(self.on_layer_selected)
+        items = [
+            f"Layer {i+1}: {layer_data['name']}"
+            for i, layer_data in enumerate(self.engine.layers)
+        ]
+        with QSignalBlocker(self.layer_list):
+            self.layer_list.clear()
+            self.layer_list.addItems(items)
+            # Select current clock layer
+            self.layer_list.setCurrentRow(self.config.get("clock_layer", 2))
         
     def on_layer_selected(self, item):
         layer_index = self.layer_list.currentRow()
@@ -637,11 +1013,12 @@ class DepthWallpaperGUI(QMainWindow):
         
         # Apply settings to engine
         self.engine.update_interval = self.config["update_interval"]
-        
+        self.engine.clock_format = self.config["clock_format"]
+        self.engine.date_format = self.config["date_format"]
+
         # If engine is running, update it
         if hasattr(self.engine, 'running') and self.engine.running:
-            self.engine.create_wallpaper_frame()
-            self.engine.set_windows_wallpaper(self.engine.wallpaper_path)
+            self.engine.update_wallpaper()
             
         self.log("Settings applied!")
         self.update_preview()
@@ -649,16 +1026,35 @@ class DepthWallpaperGUI(QMainWindow):
     def update_preview(self):
         """Update the wallpaper preview"""
         if self.engine and self.engine.wallpaper_path.exists():
-            pixmap = QPixmap(str(self.engine.wallpaper_path))
-            self.preview_widget.setPixmap(
-                pixmap.scaled(self.preview_widget.size(), 
-                            Qt.KeepAspectRatio, 
-                            Qt.SmoothTransformation)
-            )
-            self.log("Preview updated")
+            path = self.engine.wallpaper_path
+            key = f"{path}:{path.stat().st_mtime}"
+            if key == self._preview_key:
+                self.log("Preview up to date")
+                return
+            self._preview_key = key
+            pixmap = QPixmapCache.find(key)
+            if pixmap is not None:
+                self.preview_widget.set_preview(pixmap)
+                self.log("Preview updated")
+                return
+            loader = PreviewLoader(key, path, self.preview_widget.maximumSize())
+            loader.signals.loaded.connect(self.on_preview_loaded)
+            QThreadPool.globalInstance().start(loader)
         else:
             self.log("No preview available yet")
             
+    def on_preview_loaded(self, key, image):
+        if key != self._preview_key:
+            return  # a newer frame was requested while this one decoded
+        if image.isNull():
+            self._preview_key = None
+            self.log("Could not load preview")
+            return
+        pixmap = QPixmap.fromImage(image)
+        QPixmapCache.insert(key, pixmap)
+        self.preview_widget.set_preview(pixmap)
+        self.log("Preview updated")
+            
     def export_layers(self):
         if self.engine:
             self.engine.export_debug_images()
@@ -669,23 +1065,19 @@ class DepthWallpaperGUI(QMainWindow):
             QMessageBox.warning(self, "Warning", "Please initialize engine first!")
             
     def export_config(self):
-        file_path, _ = QFileDialog.getSaveFileName(
-            self, "Export Configuration", "", "JSON Files (*.json)"
+        file_path = self.run_file_dialog(
+            "Export Configuration", "JSON Files (*.json)", save=True
         )
         if file_path:
             self.save_current_settings()
-            with open(file_path, 'w') as f:
-                json.dump(self.config, f, indent=4)
+            Path(file_path).write_bytes(dump_json(self.config))
             self.log(f"Configuration exported to: {file_path}")
             
     def import_config(self):
-        file_path, _ = QFileDialog.getOpenFileName(
-            self, "Import Configuration", "", "JSON Files (*.json)"
-        )
+        file_path = self.run_file_dialog("Import Configuration", "JSON Files (*.json)")
         if file_path:
             try:
-                with open(file_path, 'r') as f:
-                    imported_config = json.load(f)
+                imported_config = load_json(Path(file_path).read_bytes())
                 self.config.update(imported_config)
                 self.load_saved_settings()
                 self.log(f"Configuration imported from: {file_path}")
@@ -695,71 +1087,102 @@ class DepthWallpaperGUI(QMainWindow):
                 
     def save_current_settings(self):
         """Save current UI settings to config"""
-        self.config.update({
-            "num_layers": self.num_layers_spin.value(),
-            "font_size": self.font_size_slider.value(),
-            "date_font_size": self.date_size_slider.value(),
-            "font_color": self.font_color.name(),
-            "shadow_color": self.shadow_color.name(),
-            "shadow_opacity": self.shadow_opacity_slider.value(),
-            "shadow_offset": self.shadow_offset_spin.value(),
-            "update_interval": self.update_interval_spin.value(),
-            "show_date": self.show_date_check.isChecked(),
-            "clock_position_x": self.h_pos_slider.value(),
-            "clock_position_y": self.v_pos_slider.value(),
-            "auto_start": self.auto_start_check.isChecked()
-        })
-        self.save_config()
-        
+        # Tabs that were never opened still hold the values from self.config
+        self.config["num_layers"] = self.num_layers_spin.value()
+        if self._tab_built[TAB_CLOCK]:
+            self.config["show_date"] = self.show_date_check.isChecked()
+            self.config["clock_position_x"] = self.h_pos_slider.value()
+            self.config["clock_position_y"] = self.v_pos_slider.value()
+            clock_format = self.read_format(
+                self.clock_format_combo, CLOCK_FORMATS, self.custom_format_input
+            )
+            if clock_format:
+                self.config["clock_format"] = clock_format
+            date_format = self.read_format(self.date_format_combo, DATE_FORMATS)
+            if date_format:
+                self.config["date_format"] = date_format
+        if self._tab_built[TAB_APPEARANCE]:
+            self.config["font_size"] = self.font_size_slider.value()
+            self.config["date_font_size"] = self.date_size_slider.value()
+            self.config["font_color"] = self.font_color.name()
+            self.config["shadow_color"] = self.shadow_color.name()
+            self.config["shadow_opacity"] = self.shadow_opacity_slider.value()
+            self.config["shadow_offset"] = self.shadow_offset_spin.value()
+        if self._tab_built[TAB_ADVANCED]:
+            self.config["update_interval"] = self.update_interval_spin.value()
+            self.config["auto_start"] = self.auto_start_check.isChecked()
+            self.config["use_jit"] = self.use_jit_check.isChecked()
+        self._save_timer.start()
+
     def load_saved_settings(self):
-        """Load config into UI elements"""
+        """Load config into UI elements
+
+        Values are set with signals blocked so the label timer is not
+        scheduled once per widget; the labels are refreshed once at the end.
+        """
         if self.config.get("image_path"):
-            self.image_path_label.setText(Path(self.config["image_path"]).name)
-        if self.config.get("font_path"):
-            self.font_path_label.setText(Path(self.config["font_path"]).name)
-            
-        self.num_layers_spin.setValue(self.config.get("num_layers", 5))
-        self.font_size_slider.setValue(self.config.get("font_size", 150))
-        self.date_size_slider.setValue(self.config.get("date_font_size", 30))
-        self.shadow_opacity_slider.setValue(self.config.get("shadow_opacity", 120))
-        self.shadow_offset_spin.setValue(self.config.get("shadow_offset", 4))
-        self.update_interval_spin.setValue(self.config.get("update_interval", 1))
-        self.show_date_check.setChecked(self.config.get("show_date", True))
-        self.h_pos_slider.setValue(self.config.get("clock_position_x", 50))
-        self.v_pos_slider.setValue(self.config.get("clock_position_y", 25))
-        self.auto_start_check.setChecked(self.config.get("auto_start", False))
-        
-        self.font_color = QColor(self.config.get("font_color", "#FFFFFF"))
-        self.update_color_button(self.font_color_btn, self.font_color)
-        
-        self.shadow_color = QColor(self.config.get("shadow_color", "#000000"))
-        self.update_color_button(self.shadow_color_btn, self.shadow_color)
-        
+            self.image_path_label.setText(os.path.basename(self.config["image_path"]))
+        set_value_silently(self.num_layers_spin, self.config.get("num_layers", 5))
+
+        if self._tab_built[TAB_CLOCK]:
+            self.show_date_check.setChecked(self.config.get("show_date", True))
+            set_value_silently(self.h_pos_slider, self.config.get("clock_position_x", 50))
+            set_value_silently(self.v_pos_slider, self.config.get("clock_position_y", 25))
+            self.set_format_controls(
+                self.clock_format_combo, CLOCK_FORMATS, self.config.get("clock_format", "%H:%M"),
+                self.custom_format_input
+            )
+            self.set_format_controls(
+                self.date_format_combo, DATE_FORMATS, self.config.get("date_format", "%a %b %d")
+            )
+
+        if self._tab_built[TAB_APPEARANCE]:
+            if self.config.get("font_path"):
+                self.font_path_label.setText(os.path.basename(self.config["font_path"]))
+            set_value_silently(self.font_size_slider, self.config.get("font_size", 150))
+            set_value_silently(self.date_size_slider, self.config.get("date_font_size", 30))
+            set_value_silently(self.shadow_opacity_slider, self.config.get("shadow_opacity", 120))
+            set_value_silently(self.shadow_offset_spin, self.config.get("shadow_offset", 4))
+
+            self.font_color = QColor(self.config.get("font_color", "#FFFFFF"))
+            self.update_color_button(self.font_color_btn, self.font_color)
+
+            self.shadow_color = QColor(self.config.get("shadow_color", "#000000"))
+            self.update_color_button(self.shadow_color_btn, self.shadow_color)
+
+        if self._tab_built[TAB_ADVANCED]:
+            set_value_silently(self.update_interval_spin, self.config.get("update_interval", 1))
+            self.auto_start_check.setChecked(self.config.get("auto_start", False))
+            self.use_jit_check.setChecked(self.config.get("use_jit", True))
+
+        self.refresh_labels()
+
     def load_config(self):
         """Load configuration from file"""
         if self.config_file.exists():
             try:
-                with open(self.config_file, 'r') as f:
-                    loaded_config = json.load(f)
-                    config = self.default_config.copy()
-                    config.update(loaded_config)
-                    return config
+                loaded_config = load_json(self.config_file.read_bytes())
+                config = self.default_config.copy()
+                config.update(loaded_config)
+                return config
             except Exception as e:
                 print(f"Error loading config: {e}")
         return self.default_config.copy()
         
+    @Slot()
     def save_config(self):
         """Save configuration to file"""
+        self._save_timer.stop()
         try:
-            with open(self.config_file, 'w') as f:
-                json.dump(self.config, f, indent=4)
+            # Autosave is compact; export_config writes the readable form
+            self.config_file.write_bytes(dump_json(self.config, indent=False))
         except Exception as e:
             print(f"Error saving config: {e}")
             
     def log(self, message):
         """Add message to log display"""
         timestamp = datetime.datetime.now().strftime("%H:%M:%S")
-        self.status_text.append(f"[{timestamp}] {message}")
+        self.status_text.appendPlainText(f"[{timestamp}] {message}")
         self.statusBar().showMessage(message)
         
     def closeEvent(self, event):
@@ -775,161 +1198,25 @@ class DepthWallpaperGUI(QMainWindow):
             if reply == QMessageBox.Yes:
                 self.stop_engine()
                 self.save_current_settings()
+                self.save_config()
                 event.accept()
             else:
                 event.ignore()
         else:
             self.save_current_settings()
+            self.save_config()
             event.accept()
             
     def get_stylesheet(self):
         """Return application stylesheet"""
-        return """
-        QMainWindow {
-            background-color: #1e1e1e;
-        }
-        QWidget {
-            background-color: #1e1e1e;
-            color: #e0e0e0;
-            font-family: 'Segoe UI', Arial, sans-serif;
-            font-size: 13px;
-        }
-        QGroupBox {
-            font-weight: bold;
-            border: 2px solid #3a3a3a;
-            border-radius: 6px;
-            margin-top: 12px;
-            padding-top: 10px;
-        }
-        QGroupBox::title {
-            subcontrol-origin: margin;
-            left: 10px;
-            padding: 0 5px;
-        }
-        QPushButton {
-            background-color: #3a3a3a;
-            border: 1px solid #555;
-            border-radius: 4px;
-            padding: 8px 16px;
-            color: #e0e0e0;
-        }
-        QPushButton:hover {
-            background-color: #4a4a4a;
-            border: 1px solid #666;
-        }
-        QPushButton:pressed {
-            background-color: #2a2a2a;
-        }
-        QPushButton:disabled {
-            background-color: #252525;
-            color: #666;
-        }
-        QLineEdit, QSpinBox, QComboBox {
-            background-color: #2b2b2b;
-            border: 1px solid #3a3a3a;
-            border-radius: 4px;
-            padding: 6px;
-            color: #e0e0e0;
-        }
-        QLineEdit:focus, QSpinBox:focus, QComboBox:focus {
-            border: 1px solid #2196F3;
-        }
-        QSlider::groove:horizontal {
-            height: 6px;
-            background: #3a3a3a;
-            border-radius: 3px;
-        }
-        QSlider::handle:horizontal {
-            background: #2196F3;
-            width: 16px;
-            margin: -5px 0;
-            border-radius: 8px;
-        }
-        QSlider::handle:horizontal:hover {
-            background: #42A5F5;
-        }
-        QTabWidget::pane {
-            border: 1px solid #3a3a3a;
-            border-radius: 4px;
-            background-color: #1e1e1e;
-        }
-        QTabBar::tab {
-            background-color: #2b2b2b;
-            border: 1px solid #3a3a3a;
-            padding: 8px 16px;
-            margin-right: 2px;
-        }
-        QTabBar::tab:selected {
-            background-color: #3a3a3a;
-            border-bottom-color: #3a3a3a;
-        }
-        QTabBar::tab:hover {
-            background-color: #4a4a4a;
-        }
-        QListWidget {
-            background-color: #2b2b2b;
-            border: 1px solid #3a3a3a;
-            border-radius: 4px;
-        }
-        QListWidget::item:selected {
-            background-color: #2196F3;
-        }
-        QListWidget::item:hover {
-            background-color: #3a3a3a;
-        }
-        QTextEdit {
-            background-color: #2b2b2b;
-            border: 1px solid #3a3a3a;
-            border-radius: 4px;
-            padding: 8px;
-        }
-        QCheckBox {
-            spacing: 8px;
-        }
-        QCheckBox::indicator {
-            width: 18px;
-            height: 18px;
-            border: 2px solid #3a3a3a;
-            border-radius: 3px;
-            background-color: #2b2b2b;
-        }
-        QCheckBox::indicator:checked {
-            background-color: #2196F3;
-            border-color: #2196F3;
-        }
-        QProgressBar {
-            border: 1px solid #3a3a3a;
-            border-radius: 4px;
-            text-align: center;
-            background-color: #2b2b2b;
-        }
-        QProgressBar::chunk {
-            background-color: #2196F3;
-            border-radius: 3px;
-        }
-        QScrollArea {
-            border: none;
-        }
-        QScrollBar:vertical {
-            background: #2b2b2b;
-            width: 12px;
-            border-radius: 6px;
-        }
-        QScrollBar::handle:vertical {
-            background: #3a3a3a;
-            border-radius: 6px;
-            min-height: 20px;
-        }
-        QScrollBar::handle:vertical:hover {
-            background: #4a4a4a;
-        }
-        """
+        return STYLESHEET
 
 
 def main():
     app = QApplication(sys.argv)
     app.setStyle('Fusion')
-    
+    QPixmapCache.setCacheLimit(32 * 1024)  # KiB, room for several previews
+
     window = DepthWallpaperGUI()
     window.show()
     
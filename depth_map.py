@@ -1,14 +1,16 @@
-import torch
-from transformers import AutoImageProcessor, AutoModelForDepthEstimation
 from PIL import Image, ImageDraw, ImageFont
-from rembg import remove
 import numpy as np
 import datetime
 import time
 import os
+import functools
 
 
 def get_depth_map(image_path):
+    # Heavy imports are deferred until a depth map is actually requested
+    import torch
+    from transformers import AutoImageProcessor, AutoModelForDepthEstimation
+
     print("Loading image...")
     image = Image.open(image_path)
 
@@ -35,9 +37,22 @@ def get_depth_map(image_path):
         align_corners=False,
     )
 
+    # Scale in place instead of building two float temporaries
     output = prediction.squeeze().cpu().numpy()
-    formatted = (output * 255 / np.max(output)).astype("uint8")
-    return Image.fromarray(formatted)
+    np.multiply(output, 255.0 / float(output.max()), out=output)
+    np.clip(output, 0, 255, out=output)
+    return Image.fromarray(output.astype(np.uint8, copy=False))
+
+
+# Loading the ONNX model is most of the cost of remove(), so each session is
+# created once. providers is a tuple, e.g. ("CUDAExecutionProvider",)
+@functools.lru_cache(maxsize=None)
+def get_rembg_session(model_name="u2net", providers=None):
+    from rembg import new_session
+
+    if providers:
+        return new_session(model_name, providers=list(providers))
+    return new_session(model_name)
 
 
 def getting_realtime_clock():
@@ -45,13 +60,16 @@ def getting_realtime_clock():
     return now.strftime("%H:%M:%S")
 
 
-def create_depth_wallpaper(image_path, realtime_clock):
+def create_depth_wallpaper(image_path, realtime_clock, providers=None):
+    from rembg import remove
+
     original_image = Image.open(image_path).convert("RGBA")
     width, height = original_image.size
 
     print("Recognizing the background and foreground...")
 
-    foreground = remove(original_image).convert("RGBA")
+    session = get_rembg_session(providers=providers)
+    foreground = remove(original_image, session=session).convert("RGBA")
 
     # Create base with original image
     combined = Image.new("RGBA", (width, height), (0, 0, 0, 255))
@@ -1,10 +1,11 @@
 from rembg import remove
 from PIL import Image
+from depth_map import get_rembg_session
 
 wallpaper = Image.open("test.jpg").convert("RGBA")
 
 # Extract foreground (subject)
-foreground = remove(wallpaper)
+foreground = remove(wallpaper, session=get_rembg_session())
 
 # Background remains unchanged
 background = wallpaper.copy()
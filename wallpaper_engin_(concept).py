@@ -1,10 +1,160 @@
-import torch
-from transformers import AutoImageProcessor, AutoModelForDepthEstimation
-from PIL import Image, ImageDraw, ImageFont, ImageFilter
+from PIL import Image, ImageDraw, ImageFont
 import numpy as np
+import cv2
 import datetime
 import time
 import os
+import subprocess
+import hashlib
+import functools
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+DEPTH_MODEL_ID = "depth-anything/Depth-Anything-V2-Small-hf"
+
+try:
+    from numba import njit, prange, set_num_threads
+except ImportError:
+    njit = None
+
+
+if njit is not None:
+
+    @njit(cache=True, parallel=True, fastmath=True)
+    def _threshold_mask(depth, threshold, out):
+        """out = 255 where depth > threshold else 0, in a single pass"""
+        for i in prange(depth.shape[0]):
+            for j in range(depth.shape[1]):
+                out[i, j] = 255 if depth[i, j] > threshold else 0
+
+
+_blend_kernels = {}  # (width, height) -> compiled text tile blend
+
+
+def _make_blend_kernel(width, height):
+    """
+    Return a Numba kernel that blends a text tile into the canvas, compiled
+    with the wallpaper size baked in as constants
+
+    Kernels are shared per resolution, so engines of the same size compile
+    once per process. Returns None without Numba.
+    """
+    if njit is None:
+        return None
+    key = (width, height)
+    if key not in _blend_kernels:
+
+        @njit(parallel=True)
+        def blend(tile, left, top, base, fg_premult, fg_inv_a, canvas):
+            # Text over background, then the premultiplied foreground on top
+            rows = min(tile.shape[0], height - top)
+            cols = min(tile.shape[1], width - left)
+            for i in prange(rows):
+                y = top + i
+                for j in range(cols):
+                    x = left + j
+                    text_a = np.int64(tile[i, j, 3])
+                    inv_a = np.int64(fg_inv_a[y, x, 0])
+                    for c in range(3):
+                        rgb = (
+                            np.int64(tile[i, j, c]) * text_a
+                            + np.int64(base[y, x, c]) * (255 - text_a)
+                            + 127
+                        ) // 255
+                        canvas[y, x, c] = (rgb * inv_a + 127) // 255 + fg_premult[y, x, c]
+
+        _blend_kernels[key] = blend
+    return _blend_kernels[key]
+
+
+try:
+    import cupy as cp
+    from cupyx.scipy import ndimage as cupy_ndimage
+except ImportError:
+    cp = None
+
+
+if cp is not None:
+
+    # One thread per pixel: rounds the blurred mask to the layer alpha and
+    # writes premultiplied foreground, alpha and foreground-over-background
+    # into an HxWx8 buffer so the host copy is a single transfer
+    _split_alpha = cp.ElementwiseKernel(
+        'raw uint8 rgba, float32 m',
+        'raw uint8 out',
+        '''
+        unsigned int a = (unsigned int)fminf(fmaxf(rintf(m), 0.0f), 255.0f);
+        unsigned int inv = 255 - a;
+        for (int c = 0; c < 3; c++) {
+            unsigned int v = rgba[i * 4 + c];
+            unsigned int p = (v * a + 127) / 255;
+            out[i * 8 + c] = p;
+            out[i * 8 + 4 + c] = (v * inv + 127) / 255 + p;
+        }
+        out[i * 8 + 3] = a;
+        out[i * 8 + 7] = 0;
+        ''',
+        'split_alpha',
+    )
+
+
+# torch, transformers and tensorrt take seconds to import, so they are
+# imported inside the methods that run the depth model. A start that hits
+# the depth map cache never imports them at all.
+
+
+@functools.lru_cache(maxsize=None)
+def _find_system_font(font_options):
+    """Return the first path in font_options that exists, or None"""
+    for font_option in font_options:
+        if os.path.exists(font_option):
+            return font_option
+    return None
+
+
+def _load_date_font(font, height):
+    """The clock font's face at date size, or the clock font if it has no file"""
+    try:
+        return ImageFont.truetype(font.path, int(height * 0.03))
+    except (AttributeError, OSError):
+        return font
+
+
+def build_trt_engine(model, input_shape, plan_path):
+    """
+    Export the depth model to ONNX at a fixed shape and compile it to an
+    FP16 TensorRT engine with trtexec
+
+    Args:
+        model: Loaded AutoModelForDepthEstimation
+        input_shape: (1, 3, H, W) shape of the processor's pixel_values
+        plan_path: Where to save the serialized engine
+    """
+    import torch
+
+    class PredictedDepth(torch.nn.Module):
+        """Wraps the HF model so ONNX export sees a single tensor output"""
+
+        def __init__(self, model):
+            super().__init__()
+            self.model = model
+
+        def forward(self, pixel_values):
+            return self.model(pixel_values=pixel_values).predicted_depth
+
+    onnx_path = os.path.splitext(plan_path)[0] + ".onnx"
+    torch.onnx.export(
+        PredictedDepth(model).eval(),
+        torch.zeros(input_shape),
+        onnx_path,
+        input_names=["pixel_values"],
+        output_names=["predicted_depth"],
+        opset_version=17,
+    )
+    subprocess.run(
+        ["trtexec", f"--onnx={onnx_path}", "--fp16", f"--saveEngine={plan_path}"],
+        check=True,
+    )
 
 
 class DepthWallpaperEngine:
@@ -25,28 +175,62 @@ class DepthWallpaperEngine:
         self.processor = None
         self.model = None
         self.original_image = None
+        self._rgba = None  # original_image as an HxWx4 uint8 array
         self.foreground = None
         self.background = None
         self.depth_map = None
         self.depth_mask = None
+        self._mask_buf = None
         self.font = None
+        self.date_font = None
+        self._base_rgb = None  # background colors behind the text
+        self._fg_premult = None  # foreground RGB * alpha / 255
+        self._fg_inv_a = None  # 255 - foreground alpha
+        self._static_rgb = None  # foreground over background, no text
+        self._text_tile = None  # ((time, date), (tile array, position))
+        self._blend = None  # text tile blend kernel for this resolution
+        self._last_time = None  # clock text of the last rendered frame
+        self._last_canvas = None
+        self._pixel_values = None  # ((path, mtime), processor output)
+        self._preprocess = None  # GPU resize + normalize for the source image
+        self._gpu_inputs = None  # (depth map, depth on device, rgba on device)
+        self.trt_context = None
+        self.trt_host_input = None
+        self.trt_buffers = None
         
     def initialize(self):
         """Load models and process image (one-time setup)"""
+        # Pillow-SIMD reports a ".postN" version; handy to confirm which build loaded
+        print(f"Pillow {Image.__version__}")
         print("Loading image...")
         self.original_image = Image.open(self.image_path).convert("RGBA")
+        self._rgba = np.array(self.original_image, dtype=np.uint8)
         width, height = self.original_image.size
         
-        print("Loading depth estimation model...")
-        self.processor = AutoImageProcessor.from_pretrained(
-            "depth-anything/Depth-Anything-V2-Small-hf"
-        )
-        self.model = AutoModelForDepthEstimation.from_pretrained(
-            "depth-anything/Depth-Anything-V2-Small-hf"
-        )
-        
-        print("Generating depth map...")
-        self.depth_map = self._get_depth_map()
+        # Depth maps are cached per image content and model, so an unchanged
+        # image never runs the model again
+        with open(self.image_path, "rb") as f:
+            digest = hashlib.sha256(f.read() + DEPTH_MODEL_ID.encode()).hexdigest()[:16]
+        depth_cache = os.path.join("cache", f"depth_{digest}.npy")
+        
+        if os.path.exists(depth_cache):
+            print("Loading cached depth map...")
+            self.depth_map = np.load(depth_cache, mmap_mode='r').astype(np.float32)
+        else:
+            print("Loading depth estimation model...")
+            from transformers import AutoModelForDepthEstimation
+            self._load_processor()
+            self.model = AutoModelForDepthEstimation.from_pretrained(DEPTH_MODEL_ID)
+            
+            print("Generating depth map...")
+            self.depth_map = self._get_depth_map()
+            
+            # float16 halves the file and is plenty for a 0-1 map; use the
+            # rounded values now too so later cached runs split identically
+            depth_half = self.depth_map.astype(np.float16)
+            os.makedirs("cache", exist_ok=True)
+            np.save(depth_cache, depth_half)
+            self.depth_map = depth_half.astype(np.float32)
         
         print("Creating depth-based segmentation...")
         self._create_depth_layers()
@@ -57,76 +241,286 @@ class DepthWallpaperEngine:
                 self.font = ImageFont.truetype(self.font_path, int(height * 0.15))
             else:
                 # Try common system fonts
-                font_options = [
+                font_option = _find_system_font((
                     "/System/Library/Fonts/Supplemental/Arial.ttf",  # macOS
                     "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf",  # Linux
                     "C:\\Windows\\Fonts\\arial.ttf",  # Windows
-                ]
-                for font_option in font_options:
-                    if os.path.exists(font_option):
-                        self.font = ImageFont.truetype(font_option, int(height * 0.15))
-                        break
+                ))
+                if font_option:
+                    self.font = ImageFont.truetype(font_option, int(height * 0.15))
                 else:
                     self.font = ImageFont.load_default()
                     print("Warning: Using default font. For better results, provide a TTF font.")
         except Exception as e:
             print(f"Font loading error: {e}. Using default font.")
             self.font = ImageFont.load_default()
+        self.date_font = _load_date_font(self.font, height)
             
+        self._blend = _make_blend_kernel(width, height)
+        
         print("Initialization complete!")
         
     def _get_depth_map(self):
         """Generate depth map from the original image"""
-        # Convert RGBA to RGB for depth estimation
-        image_rgb = self.original_image.convert("RGB")
-        inputs = self.processor(images=image_rgb, return_tensors="pt")
+        import torch
+        
+        pixel_values = self.get_cache()
+        
+        if self._load_trt_engine(tuple(pixel_values.shape)):
+            predicted_depth = self._run_trt_engine(pixel_values)
+        else:
+            predicted_depth = self._run_torch_model(pixel_values)
+        
+        # Upsample and normalize on the GPU when there is one; only the
+        # finished full-resolution map is copied back to the host
+        if torch.cuda.is_available():
+            predicted_depth = predicted_depth.to("cuda")
         
         with torch.no_grad():
-            outputs = self.model(**inputs)
-            predicted_depth = outputs.predicted_depth
-        
-        prediction = torch.nn.functional.interpolate(
-            predicted_depth.unsqueeze(1),
-            size=self.original_image.size[::-1],
-            mode="bicubic",
-            align_corners=False,
-        )
+            prediction = torch.nn.functional.interpolate(
+                predicted_depth.unsqueeze(1),
+                size=self.original_image.size[::-1],
+                mode="bicubic",
+                align_corners=False,
+            )
+            
+            # Normalize to 0-1 range: min and max in one pass, then in place
+            depth_min, depth_max = torch.aminmax(prediction)
+            prediction.sub_(depth_min).div_(depth_max - depth_min)
+        
+        return prediction.squeeze().cpu().numpy()
+    
+    def _run_torch_model(self, pixel_values):
+        """
+        PyTorch forward pass used when TensorRT isn't available
         
-        output = prediction.squeeze().cpu().numpy()
+        The model runs in FP16 on CUDA when there is a GPU. It runs eagerly:
+        the depth map is computed once per image and then cached, so
+        torch.compile's compile and graph capture would land on the only call.
+        """
+        import torch
+        
+        self.model.eval()
+        if torch.cuda.is_available():
+            self.model.to("cuda").half()
+                
+        param = next(self.model.parameters())
+        pixel_values = pixel_values.to(param.device, param.dtype)
+        with torch.no_grad():
+            outputs = self.model(pixel_values=pixel_values)
+        return outputs.predicted_depth.float()
+    
+    def _load_processor(self):
+        """The depth model's image processor, loaded on first use"""
+        if self.processor is None:
+            from transformers import AutoImageProcessor
+            self.processor = AutoImageProcessor.from_pretrained(DEPTH_MODEL_ID)
+        return self.processor
+    
+    def get_cache(self):
+        """
+        Preprocessed model input (pixel_values) for the source image
+        
+        The resize + normalize is done once and reused until the image file
+        changes, so re-running depth estimation skips it.
+        """
+        key = (self.image_path, os.path.getmtime(self.image_path))
+        if self._pixel_values is None or self._pixel_values[0] != key:
+            # Convert RGBA to RGB for depth estimation
+            image_rgb = self.original_image.convert("RGB")
+            pixel_values = self._preprocess_gpu(image_rgb)
+            if pixel_values is None:
+                processor = self._load_processor()
+                inputs = processor(images=image_rgb, return_tensors="pt")
+                pixel_values = inputs["pixel_values"]
+            self._pixel_values = (key, pixel_values)
+        return self._pixel_values[1]
+    
+    def _preprocess_gpu(self, image_rgb):
+        """
+        The processor's resize + rescale + normalize done with torchvision
+        on the GPU, leaving pixel_values on the device
         
-        # Normalize to 0-1 range
-        output = (output - output.min()) / (output.max() - output.min())
+        The output size follows the processor: keep the aspect ratio and
+        round each side to a multiple of `ensure_multiple_of`. Returns None
+        (use the processor) when CUDA or torchvision is missing.
+        """
+        import torch
         
-        return output
+        if not torch.cuda.is_available():
+            return None
+        try:
+            from torchvision.transforms import v2
+        except ImportError:
+            return None
+            
+        if self._preprocess is None:
+            processor = self._load_processor()
+            width, height = image_rgb.size
+            scale_h = processor.size["height"] / height
+            scale_w = processor.size["width"] / width
+            scale = scale_w if abs(1 - scale_w) < abs(1 - scale_h) else scale_h
+            multiple = getattr(processor, "ensure_multiple_of", 1)
+            out_size = [
+                max(round(side * scale / multiple) * multiple, multiple)
+                for side in (height, width)
+            ]
+            self._preprocess = v2.Compose([
+                v2.ToDtype(torch.float32, scale=True),
+                v2.Resize(out_size, interpolation=v2.InterpolationMode.BICUBIC, antialias=True),
+                v2.Normalize(processor.image_mean, processor.image_std),
+            ])
+            
+        image = v2.functional.pil_to_tensor(image_rgb).to("cuda", non_blocking=True)
+        return self._preprocess(image).unsqueeze(0)
+    
+    def _load_trt_engine(self, input_shape):
+        """
+        Load the TensorRT engine for input_shape, building it on first use
+        
+        Returns False (use the PyTorch model) when TensorRT or CUDA is missing
+        """
+        import torch
+        
+        try:
+            import tensorrt as trt
+        except ImportError:
+            return False
+        if not torch.cuda.is_available():
+            return False
+        if self.trt_host_input is not None and tuple(self.trt_host_input.shape) == input_shape:
+            return True
+            
+        plan_path = os.path.join("trt_engines", "depth_{}x{}.plan".format(*input_shape[2:]))
+        try:
+            if not os.path.exists(plan_path):
+                print("Building TensorRT FP16 engine (first run only)...")
+                os.makedirs("trt_engines", exist_ok=True)
+                build_trt_engine(self.model, input_shape, plan_path)
+            runtime = trt.Runtime(trt.Logger(trt.Logger.WARNING))
+            with open(plan_path, "rb") as f:
+                engine = runtime.deserialize_cuda_engine(f.read())
+            self.trt_context = engine.create_execution_context()
+            output_shape = tuple(engine.get_tensor_shape("predicted_depth"))
+        except Exception as e:
+            print(f"TensorRT unavailable ({e}). Using PyTorch model.")
+            return False
+            
+        # Pinned host and device buffers are allocated once and reused
+        self.trt_host_input = torch.empty(input_shape, dtype=torch.float32).pin_memory()
+        self.trt_buffers = {
+            "pixel_values": torch.empty(input_shape, dtype=torch.float32, device="cuda"),
+            "predicted_depth": torch.empty(output_shape, dtype=torch.float32, device="cuda"),
+        }
+        for name, buffer in self.trt_buffers.items():
+            self.trt_context.set_tensor_address(name, buffer.data_ptr())
+        return True
+    
+    def _run_trt_engine(self, pixel_values):
+        """Run the TensorRT engine and return predicted_depth on the GPU"""
+        import torch
+        
+        stream = torch.cuda.current_stream()
+        if pixel_values.is_cuda:
+            self.trt_buffers["pixel_values"].copy_(pixel_values)
+        else:
+            self.trt_host_input.copy_(pixel_values)
+            self.trt_buffers["pixel_values"].copy_(self.trt_host_input, non_blocking=True)
+        self.trt_context.execute_async_v3(stream.cuda_stream)
+        stream.synchronize()
+        return self.trt_buffers["predicted_depth"]
     
     def _create_depth_layers(self):
         """Create foreground and background layers using depth map"""
+        if cp is not None and cp.cuda.is_available():
+            self._create_depth_layers_gpu()
+            return
+        
         # Create binary mask based on depth threshold
         # Higher depth values = closer to camera (foreground)
-        mask_array = (self.depth_map > self.depth_threshold).astype(np.uint8) * 255
-        
-        # Apply morphological operations to clean up the mask
-        mask = Image.fromarray(mask_array, mode='L')
+        if self._mask_buf is None or self._mask_buf.shape != self.depth_map.shape:
+            self._mask_buf = np.empty(self.depth_map.shape, dtype=np.uint8)
+        mask_array = self._mask_buf
+        if njit is not None:
+            # NumPy compares a float32 map against the threshold in float32
+            threshold = self.depth_map.dtype.type(self.depth_threshold)
+            _threshold_mask(self.depth_map, threshold, mask_array)
+        else:
+            np.multiply(self.depth_map > self.depth_threshold, np.uint8(255), out=mask_array)
         
         # Slight blur to smooth edges (removes harsh transitions)
-        mask = mask.filter(ImageFilter.GaussianBlur(radius=2))
+        mask_array = cv2.GaussianBlur(
+            mask_array, (0, 0), 2.0, borderType=cv2.BORDER_REPLICATE
+        )
         
         # Optional: erode slightly to avoid edge artifacts
-        # mask = mask.filter(ImageFilter.MinFilter(3))
+        # mask_array = cv2.erode(mask_array, np.ones((3, 3), np.uint8))
         
-        self.depth_mask = mask
+        self.depth_mask = mask_array
         
         # Create foreground layer (closer objects)
-        self.foreground = Image.new("RGBA", self.original_image.size, (0, 0, 0, 0))
-        self.foreground.paste(self.original_image, (0, 0))
-        self.foreground.putalpha(mask)
+        fg = self._rgba.copy()
+        fg[..., 3] = mask_array
+        self.foreground = Image.fromarray(fg, mode='RGBA')
         
         # Create background layer (farther objects)
         # Invert the mask for background
-        bg_mask = Image.fromarray(255 - np.array(mask), mode='L')
-        self.background = Image.new("RGBA", self.original_image.size, (0, 0, 0, 0))
-        self.background.paste(self.original_image, (0, 0))
-        self.background.putalpha(bg_mask)
+        bg = self._rgba.copy()
+        np.subtract(255, mask_array, out=bg[..., 3])
+        self.background = Image.fromarray(bg, mode='RGBA')
+        
+        # Premultiply the foreground once so blending it over anything is
+        # out = c * inv_a / 255 + premult, with no per-pixel divide by alpha
+        # The background colors never change, so _base_rgb is a view of _rgba
+        fg_alpha = fg[..., 3:4].astype(np.uint16)
+        self._base_rgb = self._rgba[..., :3]
+        self._fg_premult = ((fg[..., :3] * fg_alpha + 127) // 255).astype(np.uint8)
+        self._fg_inv_a = bg[..., 3:4].copy()
+        
+        # Frames only change where the text is; everything else is this
+        self._static_rgb = self._blend_foreground(
+            self._base_rgb.astype(np.uint16), np.s_[:, :]
+        )
+        
+    def _create_depth_layers_gpu(self):
+        """Same layers as _create_depth_layers, built on the GPU with CuPy"""
+        if self._gpu_inputs is None or self._gpu_inputs[0] is not self.depth_map:
+            self._gpu_inputs = (
+                self.depth_map,
+                cp.asarray(self.depth_map, dtype=cp.float32),
+                cp.asarray(self._rgba),
+            )
+        _, depth, rgba = self._gpu_inputs
+        
+        mask = (depth > cp.float32(self.depth_threshold)).astype(cp.float32)
+        mask *= 255
+        # truncate=3 gives the same 13-tap kernel cv2 picks for sigma 2
+        mask = cupy_ndimage.gaussian_filter(mask, 2.0, mode='nearest', truncate=3.0)
+        
+        packed = cp.empty(mask.shape + (8,), dtype=cp.uint8)
+        _split_alpha(rgba, mask, packed)
+        packed = cp.asnumpy(packed)
+        
+        mask_array = np.ascontiguousarray(packed[..., 3])
+        self.depth_mask = mask_array
+        
+        fg = self._rgba.copy()
+        fg[..., 3] = mask_array
+        self.foreground = Image.fromarray(fg, mode='RGBA')
+        
+        bg = self._rgba.copy()
+        np.subtract(255, mask_array, out=bg[..., 3])
+        self.background = Image.fromarray(bg, mode='RGBA')
+        
+        self._base_rgb = self._rgba[..., :3]
+        self._fg_premult = np.ascontiguousarray(packed[..., :3])
+        self._fg_inv_a = bg[..., 3:4].copy()
+        self._static_rgb = np.ascontiguousarray(packed[..., 4:7])
+        
+    def _blend_foreground(self, rgb, region):
+        """Composite the premultiplied foreground over uint16 `rgb` in `region`"""
+        blended = (rgb * self._fg_inv_a[region] + 127) // 255 + self._fg_premult[region]
+        return blended.astype(np.uint8)
         
     def adjust_threshold(self, new_threshold):
         """
@@ -139,69 +533,126 @@ class DepthWallpaperEngine:
         self.depth_threshold = new_threshold
         print(f"Adjusting depth threshold to {new_threshold}...")
         self._create_depth_layers()
+        self._last_time = None
         print("Layers regenerated!")
     
-    def _get_realtime_clock(self):
+    def _get_realtime_clock(self, now=None):
         """Get current time as formatted string"""
-        now = datetime.datetime.now()
+        if now is None:
+            now = datetime.datetime.now()
         return now.strftime("%H:%M")
     
-    def create_frame(self, output_path="output_image.png", save_debug=False):
-        """Create a single wallpaper frame with current time"""
-        width, height = self.original_image.size
-        current_time = self._get_realtime_clock()
-        
-        # Create base canvas
-        canvas = Image.new("RGBA", (width, height), (0, 0, 0, 0))
-        
-        # Paste background (far objects)
-        canvas.alpha_composite(self.background, (0, 0))
+    def _get_text_tile(self, current_time, date_text):
+        """
+        Render the time, its shadow and the date into a tile covering only
+        their bounding box
         
-        # Create text layer
-        text_layer = Image.new("RGBA", (width, height), (0, 0, 0, 0))
-        draw = ImageDraw.Draw(text_layer)
+        Returns (RGBA array, (x, y)) or None if nothing lands on the image.
+        The result is reused until the time or date text changes.
+        """
+        key = (current_time, date_text)
+        if self._text_tile is not None and self._text_tile[0] == key:
+            return self._text_tile[1]
+            
+        height, width = self._base_rgb.shape[:2]
         
         # Calculate text position
-        text_bbox = draw.textbbox((0, 0), current_time, font=self.font)
+        text_bbox = self.font.getbbox(current_time)
         text_width = text_bbox[2] - text_bbox[0]
-        text_height = text_bbox[3] - text_bbox[1]
         
         # Position text in upper-middle area
         position = ((width - text_width) // 2, int(height * 0.25))
-        
-        # Draw time with shadow for depth
         shadow_offset = 3
-        draw.text((position[0] + shadow_offset, position[1] + shadow_offset), 
-                 current_time, fill=(0, 0, 0, 100), font=self.font)
-        draw.text(position, current_time, fill=(255, 255, 255, 255), font=self.font)
         
-        # Add date
-        date_text = datetime.datetime.now().strftime("%a %b %d")
-        try:
-            date_font = ImageFont.truetype(self.font.path, int(height * 0.03))
-        except:
-            date_font = self.font
-            
-        date_bbox = draw.textbbox((0, 0), date_text, font=date_font)
+        if self.date_font is None:
+            self.date_font = _load_date_font(self.font, height)
+        date_font = self.date_font
+        date_bbox = date_font.getbbox(date_text)
         date_width = date_bbox[2] - date_bbox[0]
         date_position = ((width - date_width) // 2, position[1] - int(height * 0.05))
-        draw.text(date_position, date_text, fill=(255, 255, 255, 200), font=date_font)
+        
+        # Tile bounds, clipped to the image
+        left = max(min(position[0] + text_bbox[0], date_position[0] + date_bbox[0]), 0)
+        top = max(min(position[1] + text_bbox[1], date_position[1] + date_bbox[1]), 0)
+        right = min(
+            max(position[0] + text_bbox[2] + shadow_offset, date_position[0] + date_bbox[2]),
+            width,
+        )
+        bottom = min(
+            max(position[1] + text_bbox[3] + shadow_offset, date_position[1] + date_bbox[3]),
+            height,
+        )
+        
+        text_tile = None
+        if right > left and bottom > top:
+            tile = Image.new("RGBA", (right - left, bottom - top), (0, 0, 0, 0))
+            draw = ImageDraw.Draw(tile)
+            x, y = position[0] - left, position[1] - top
+            
+            # Draw time with shadow for depth
+            draw.text((x + shadow_offset, y + shadow_offset),
+                     current_time, fill=(0, 0, 0, 100), font=self.font)
+            draw.text((x, y), current_time, fill=(255, 255, 255, 255), font=self.font)
+            draw.text((date_position[0] - left, date_position[1] - top), date_text,
+                      fill=(255, 255, 255, 200), font=date_font)
+            text_tile = (np.asarray(tile), (left, top))
+            
+        self._text_tile = (key, text_tile)
+        return text_tile
+    
+    def create_frame(self, output_path="output_image.png", save_debug=False, now=None,
+                     force=True):
+        """
+        Create a single wallpaper frame with current time (or `now`)
+        
+        With force=False, a frame whose clock text matches the last one
+        returns that frame without compositing or saving it again.
+        """
+        if now is None:
+            now = datetime.datetime.now()
+        current_time = self._get_realtime_clock(now)
+        if not force and current_time == self._last_time:
+            return self._last_canvas
+        
+        # Outside the text tile the frame is the precomposited static image
+        canvas = self._static_rgb.copy()
+        
+        # Add date
+        date_text = now.strftime("%a %b %d")
         
         # Composite: background -> text -> foreground (creates depth effect)
-        canvas.alpha_composite(text_layer, (0, 0))
-        canvas.alpha_composite(self.foreground, (0, 0))
+        text_tile = self._get_text_tile(current_time, date_text)
+        if text_tile is not None:
+            tile, (left, top) = text_tile
+            if self._blend is not None:
+                self._blend(
+                    tile, left, top, self._base_rgb,
+                    self._fg_premult, self._fg_inv_a, canvas,
+                )
+            else:
+                region = np.s_[top:top + tile.shape[0], left:left + tile.shape[1]]
+                text_alpha = tile[..., 3:4].astype(np.uint16)
+                rgb = (
+                    tile[..., :3] * text_alpha
+                    + self._base_rgb[region] * (255 - text_alpha)
+                    + 127
+                ) // 255
+                canvas[region] = self._blend_foreground(rgb, region)
+        canvas = Image.fromarray(canvas, mode='RGB')
         
         # Save output
-        canvas.convert("RGB").save(output_path)
+        canvas.save(output_path)
         print(f"Saved wallpaper: {output_path} [{current_time}]")
+        self._last_time = current_time
+        self._last_canvas = canvas
         
         # Save debug images
         if save_debug:
-            self.depth_map_vis = Image.fromarray(
-                (self.depth_map * 255).astype('uint8'), mode='L'
-            )
+            depth_vis = np.empty(self.depth_map.shape, dtype=np.uint8)
+            np.multiply(self.depth_map, 255, out=depth_vis, casting='unsafe')
+            self.depth_map_vis = Image.fromarray(depth_vis, mode='L')
             self.depth_map_vis.save("debug_depth_map.png")
-            self.depth_mask.save("debug_mask.png")
+            Image.fromarray(self.depth_mask, mode='L').save("debug_mask.png")
             self.foreground.save("debug_foreground.png")
             self.background.save("debug_background.png")
             print("Debug images saved!")
@@ -221,10 +672,17 @@ class DepthWallpaperEngine:
         update_count = 0
         try:
             while max_updates is None or update_count < max_updates:
-                timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+                now = datetime.datetime.now()
+                
+                # The clock only shows minutes; don't re-render the same one
+                if self._get_realtime_clock(now) == self._last_time:
+                    time.sleep(self.update_interval)
+                    continue
+                
+                timestamp = now.strftime("%Y%m%d_%H%M%S")
                 output_path = os.path.join(output_dir, f"wallpaper_{timestamp}.png")
                 
-                self.create_frame(output_path)
+                self.create_frame(output_path, now=now)
                 update_count += 1
                 
                 time.sleep(self.update_interval)
@@ -232,6 +690,75 @@ class DepthWallpaperEngine:
             print("\nWallpaper engine stopped by user")
         
         print(f"Total updates: {update_count}")
+        
+    def run_batch(self, times, output_dir="wallpapers", max_workers=None):
+        """
+        Pre-render one wallpaper per datetime in `times` across processes
+        
+        Args:
+            times: datetime objects to render the clock for
+            output_dir: Directory to save the wallpapers
+            max_workers: Worker processes (default: one per CPU, at most 8)
+            
+        Returns:
+            List of output paths, in the same order as `times`
+        """
+        os.makedirs(output_dir, exist_ok=True)
+        output_paths = [
+            os.path.join(output_dir, f"wallpaper_{t.strftime('%Y%m%d_%H%M%S')}.png")
+            for t in times
+        ]
+        
+        # Workers get the finished layers and the font file, not the model.
+        # They are spawned, not forked: forking after numba/OpenCV have
+        # started their thread pools can deadlock
+        font_path = getattr(self.font, "path", None)
+        font_size = getattr(self.font, "size", None)
+        
+        # Each worker compiles its own blend kernel and holds its own copy
+        # of the layers, so past a few workers that cost outgrows the gain
+        if max_workers is None:
+            max_workers = max(1, min(len(times), os.cpu_count() or 1, 8))
+        with ProcessPoolExecutor(
+            max_workers=max_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_batch_worker,
+            initargs=(
+                self._base_rgb, self._fg_premult, self._fg_inv_a, self._static_rgb,
+                font_path, font_size,
+            ),
+        ) as executor:
+            return list(executor.map(_render_batch_frame, times, output_paths))
+
+
+# Per-process renderer used by DepthWallpaperEngine.run_batch
+_batch_engine = None
+
+
+def _init_batch_worker(base_rgb, fg_premult, fg_inv_a, static_rgb, font_path, font_size):
+    """Build a render-only engine once per worker process"""
+    global _batch_engine
+    # The processes already use every core; a full Numba thread pool in
+    # each would oversubscribe them
+    if njit is not None:
+        set_num_threads(1)
+    engine = DepthWallpaperEngine(image_path=None)
+    engine._base_rgb = base_rgb
+    engine._fg_premult = fg_premult
+    engine._fg_inv_a = fg_inv_a
+    engine._static_rgb = static_rgb
+    engine._blend = _make_blend_kernel(static_rgb.shape[1], static_rgb.shape[0])
+    if font_path:
+        engine.font = ImageFont.truetype(font_path, font_size)
+    else:
+        engine.font = ImageFont.load_default()
+    engine.date_font = _load_date_font(engine.font, static_rgb.shape[0])
+    _batch_engine = engine
+
+
+def _render_batch_frame(now, output_path):
+    _batch_engine.create_frame(output_path, now=now)
+    return output_path
 
 
 def main():
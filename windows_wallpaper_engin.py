@@ -1,7 +1,6 @@
-import torch
-from transformers import AutoImageProcessor, AutoModelForDepthEstimation
-from PIL import Image, ImageDraw, ImageFont, ImageFilter
+from PIL import Image, ImageDraw, ImageFont
 import numpy as np
+import cv2
 import datetime
 import time
 import os
@@ -13,10 +12,99 @@ import pystray
 from pystray import MenuItem as item
 from PIL import Image as PILImage
 import json
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    from numba import njit, prange
+except ImportError:
+    njit = None
+
+
+if njit is not None:
+
+    @njit(cache=True, parallel=True, fastmath=True)
+    def _over_premultiplied(dst, src):
+        """In-place premultiplied "over" of src onto dst (both HxWx4 uint8)"""
+        height, width = dst.shape[0], dst.shape[1]
+        for y in prange(height):
+            for x in range(width):
+                src_a = src[y, x, 3]
+                if src_a == 0:
+                    continue
+                if src_a == 255:
+                    for c in range(4):
+                        dst[y, x, c] = src[y, x, c]
+                    continue
+                inv_a = 255 - np.int32(src_a)
+                for c in range(4):
+                    dst[y, x, c] = src[y, x, c] + (np.int32(dst[y, x, c]) * inv_a + 127) // 255
+
+    @njit(cache=True, parallel=True, fastmath=True)
+    def _over_stack(dst, layers):
+        """
+        Premultiplied "over" of layers[0], layers[1], ... onto dst in one
+        pass over the pixels (layers is NxHxWx4 uint8)
+        """
+        height, width = dst.shape[0], dst.shape[1]
+        for y in prange(height):
+            for x in range(width):
+                # Anything under the top-most opaque layer is hidden
+                first = 0
+                for k in range(layers.shape[0] - 1, -1, -1):
+                    if layers[k, y, x, 3] == 255:
+                        first = k
+                        break
+                for k in range(first, layers.shape[0]):
+                    src_a = layers[k, y, x, 3]
+                    if src_a == 0:
+                        continue
+                    if src_a == 255:
+                        for c in range(4):
+                            dst[y, x, c] = layers[k, y, x, c]
+                        continue
+                    inv_a = 255 - np.int32(src_a)
+                    for c in range(4):
+                        dst[y, x, c] = layers[k, y, x, c] + (
+                            np.int32(dst[y, x, c]) * inv_a + 127
+                        ) // 255
+
+    @njit(cache=True, parallel=True, fastmath=True)
+    def _layer_masks(depth, thresholds, out):
+        """
+        out[k] = 255 where depth falls in layer k, for all layers in one pass
+
+        thresholds are the inner layer boundaries; a pixel belongs to the
+        number of boundaries strictly below its depth. out starts zeroed.
+        """
+        for y in prange(depth.shape[0]):
+            for x in range(depth.shape[1]):
+                d = depth[y, x]
+                k = 0
+                for t in thresholds:
+                    if d > t:
+                        k += 1
+                out[k, y, x] = 255
+
+
+def _over_premultiplied_numpy(dst, src):
+    """NumPy version of _over_premultiplied, for when Numba is off"""
+    inv_a = 255 - src[..., 3:4].astype(np.uint16)
+    dst[...] = src + (dst * inv_a + 127) // 255
+
+
+def _premultiply(rgba):
+    """Straight-alpha HxWx4 uint8 array -> premultiplied copy"""
+    alpha = rgba[..., 3:4].astype(np.uint16)
+    premult = np.empty(rgba.shape, dtype=np.uint8)
+    premult[..., :3] = (rgba[..., :3] * alpha + 127) // 255
+    premult[..., 3] = rgba[..., 3]
+    return premult
 
 
 class MultiLayerDepthEngine:
-    def __init__(self, image_path, font_path=None, update_interval=1, num_layers=5):
+    def __init__(
+        self, image_path, font_path=None, update_interval=1, num_layers=5, use_jit=True
+    ):
         """
         Optimized Multi-Layer Depth Wallpaper Engine
         AI model runs ONCE, then only updates clock in real-time
@@ -26,22 +114,46 @@ class MultiLayerDepthEngine:
             font_path: Path to TTF font file (optional)
             update_interval: Seconds between clock updates (default: 1)
             num_layers: Number of depth layers to create (default: 5)
+            use_jit: Composite with the Numba kernel when numba is installed
         """
         self.image_path = image_path
         self.font_path = font_path
         self.update_interval = update_interval
         self.num_layers = num_layers
+        self.use_jit = use_jit and njit is not None
+        self.clock_format = "%H:%M"
+        self.date_format = "%a %b %d"
         self.processor = None
         self.model = None
-        self.original_image = None
+        self.device = "cpu"
+        self.original_rgba = None  # the image as an HxWx4 uint8 array
         self.depth_map = None
         self.layers = []  # List of (layer_image, depth_value) tuples
         self.clock_layer_index = (
             2  # Which layer to place clock (0=back, num_layers=front)
         )
+        # Layers behind / in front of the clock flattened into one
+        # premultiplied array each; rebuilt when the clock moves
+        self._bg_composite = None  # opaque
+        self._fg_composite = None  # None when the clock is in front
+        self._static_composite = None  # the whole frame without the clock
+        # Frame buffers reused by every frame (see _frame_buffers)
+        self._canvas = None
+        self._canvas_array = None
+        self._rgb_canvas = None
+        self._clock_rect = None  # canvas slice the clock was drawn in
+        self._saved_rows = {}  # file path -> (top, bottom) clock rows in it
+        self._frame_lock = threading.Lock()
         self.font = None
+        self.date_font = None
+        self._bboxes = {}  # (font, text) -> bbox, for the current fonts
         self.running = False
         self.update_thread = None
+        self._wake = threading.Event()  # set by stop() to end a wait early
+        self._last_render_key = None  # (clock text, date text) last rendered
+        self._wallpaper_executor = None  # runs wallpaper sets while running
+        self._pending_set = None  # (path, Future) of the last queued set
+        self._set_lock = threading.Lock()  # one render + set at a time
         self.icon = None
 
         # Create output directory
@@ -49,7 +161,16 @@ class MultiLayerDepthEngine:
             r"C:\Users\malmi\OneDrive\Documents\Python\wallpaper_engin"
         )
         self.output_dir.mkdir(exist_ok=True)
-        self.wallpaper_path = self.output_dir / "current_wallpaper.jpg"
+        # BMP: Windows takes it as-is and writing it is a plain copy, with
+        # no JPEG encode on every update. Frames alternate between two files
+        # so one is written while Windows may still be loading the other;
+        # wallpaper_path is the latest finished frame
+        self._wallpaper_paths = (
+            self.output_dir / "current_wallpaper_A.bmp",
+            self.output_dir / "current_wallpaper_B.bmp",
+        )
+        self._buffer_index = 0
+        self.wallpaper_path = self._wallpaper_paths[0]
         self.cache_dir = self.output_dir / "cache"
         self.cache_dir.mkdir(exist_ok=True)
 
@@ -60,24 +181,32 @@ class MultiLayerDepthEngine:
         print("=" * 60)
 
         print("\n[1/5] Loading image...")
-        self.original_image = Image.open(self.image_path).convert("RGBA")
-        width, height = self.original_image.size
+        self.original_rgba = np.asarray(Image.open(self.image_path).convert("RGBA"))
+        height, width = self.original_rgba.shape[:2]
         print(f"      Image size: {width}x{height}")
 
         # Try to load cached layers first
         if self._load_cached_layers():
             print("\nâœ“ Loaded pre-processed layers from cache!")
             self._load_font()
+            self._rebuild_composites()
             return
 
         print("\n[2/5] Loading AI depth model...")
         print("      (This only happens once!)")
+        # Imported here, not at module level: torch/transformers take seconds
+        # to import and the GUI imports this module at launch
+        import torch
+        from transformers import AutoImageProcessor, AutoModelForDepthEstimation
+
         self.processor = AutoImageProcessor.from_pretrained(
             "depth-anything/Depth-Anything-V2-Small-hf"
         )
         self.model = AutoModelForDepthEstimation.from_pretrained(
             "depth-anything/Depth-Anything-V2-Small-hf"
         )
+        self.device = "cuda" if torch.cuda.is_available() else "cpu"
+        self.model.to(self.device).eval()
 
         print("\n[3/5] Generating depth map with AI...")
         print("      (Processing...)")
@@ -93,6 +222,7 @@ class MultiLayerDepthEngine:
 
         print("\n[5/5] Loading font...")
         self._load_font()
+        self._rebuild_composites()
 
         # Clear model from memory
         del self.model
@@ -108,9 +238,21 @@ class MultiLayerDepthEngine:
         print("Now only the clock updates - NO MORE AI PROCESSING!")
         print("=" * 60 + "\n")
 
+    @property
+    def original_image(self):
+        """PIL view of original_rgba, made on demand"""
+        if self.original_rgba is None:
+            return None
+        return Image.fromarray(self.original_rgba, "RGBA")
+
+    @original_image.setter
+    def original_image(self, image):
+        self.original_rgba = np.asarray(image.convert("RGBA"))
+
     def _load_font(self):
         """Load font for clock display"""
-        width, height = self.original_image.size
+        height = self.original_rgba.shape[0]
+        self._bboxes = {}
         try:
             if self.font_path and os.path.exists(self.font_path):
                 self.font = ImageFont.truetype(self.font_path, int(height * 0.15))
@@ -129,29 +271,141 @@ class MultiLayerDepthEngine:
         except Exception as e:
             print(f"      Font loading error: {e}. Using default font.")
             self.font = ImageFont.load_default()
+
+        try:
+            self.date_font = ImageFont.truetype(self.font.path, int(height * 0.03))
+        except:
+            self.date_font = self.font
         print("      âœ“ Font loaded!")
 
     def _get_depth_map(self):
         """Generate depth map from the original image (ONCE)"""
-        image_rgb = self.original_image.convert("RGB")
-        inputs = self.processor(images=image_rgb, return_tensors="pt")
-
-        with torch.no_grad():
-            outputs = self.model(**inputs)
-            predicted_depth = outputs.predicted_depth
-
-        prediction = torch.nn.functional.interpolate(
-            predicted_depth.unsqueeze(1),
-            size=self.original_image.size[::-1],
-            mode="bicubic",
-            align_corners=False,
+        import torch
+
+        # The processor takes the HxWx3 array as is
+        inputs = self.processor(
+            images=self.original_rgba[..., :3], return_tensors="pt"
         )
 
-        output = prediction.squeeze().cpu().numpy()
-        output = (output - output.min()) / (output.max() - output.min())
+        # On a GPU the PyTorch model in FP16 beats the INT8 CPU session.
+        # Without onnxruntime the CPU runs a TorchScript trace of the model
+        # with its Linear layers quantized to INT8
+        session = traced = None
+        if self.device == "cpu":
+            session = self._build_onnx_session(tuple(inputs["pixel_values"].shape))
+            if session is None:
+                traced = self._load_traced_model(inputs["pixel_values"])
+
+        with torch.inference_mode():
+            if session is not None:
+                (depth,) = session.run(
+                    None, {"pixel_values": inputs["pixel_values"].numpy()}
+                )
+                predicted_depth = torch.from_numpy(depth)
+            elif traced is not None:
+                predicted_depth = traced(inputs["pixel_values"])
+            else:
+                inputs = {k: v.to(self.device) for k, v in inputs.items()}
+                with torch.autocast(
+                    self.device, dtype=torch.float16, enabled=self.device == "cuda"
+                ):
+                    outputs = self.model(**inputs)
+                predicted_depth = outputs.predicted_depth.float()
+
+        # Only the model-sized map leaves the device; OpenCV's bicubic resize
+        # is cheaper than a full-resolution torch upsample copied back after
+        small_depth = predicted_depth.squeeze().cpu().numpy()
+        height, width = self.original_rgba.shape[:2]
+        output = cv2.resize(small_depth, (width, height), interpolation=cv2.INTER_CUBIC)
+        cv2.normalize(output, output, 0, 1, cv2.NORM_MINMAX)
 
         return output
 
+    def _depth_module(self):
+        """The model as a module taking pixel_values, returning predicted_depth"""
+        import torch
+
+        class PredictedDepth(torch.nn.Module):
+            """Wraps the HF model so export/tracing sees a single tensor output"""
+
+            def __init__(self, model):
+                super().__init__()
+                self.model = model
+
+            def forward(self, pixel_values):
+                return self.model(pixel_values=pixel_values).predicted_depth
+
+        return PredictedDepth(self.model).eval()
+
+    def _load_traced_model(self, pixel_values):
+        """
+        TorchScript trace of the (INT8-quantized) depth model for CPU
+        inference
+
+        Traced once per input shape and saved in the cache folder with its
+        quantized weights, so later runs only load it. Returns None (run the
+        model eagerly) on failure.
+        """
+        import torch
+
+        trace_path = self.cache_dir / "depth_anything_v2_small_{}x{}_int8.pt".format(
+            *pixel_values.shape[2:]
+        )
+        try:
+            if trace_path.exists():
+                return torch.jit.load(str(trace_path), map_location="cpu")
+            print("      Tracing depth model (first run only)...")
+            self.model = torch.ao.quantization.quantize_dynamic(
+                self.model, {torch.nn.Linear}, dtype=torch.qint8
+            )
+            with torch.no_grad():
+                traced = torch.jit.trace(self._depth_module(), pixel_values, strict=False)
+            traced = torch.jit.freeze(traced)
+            torch.jit.save(traced, str(trace_path))
+            return traced
+        except Exception as e:
+            print(f"      TorchScript unavailable ({e}). Running model eagerly.")
+            return None
+
+    def _build_onnx_session(self, input_shape):
+        """
+        ONNX Runtime session running an INT8 copy of the depth model
+
+        The model is exported at input_shape and its weights quantized once;
+        the files are kept in the cache folder. Returns None (use PyTorch)
+        when onnxruntime is missing or the export fails.
+        """
+        try:
+            import onnxruntime as ort
+            from onnxruntime.quantization import QuantType, quantize_dynamic
+        except ImportError:
+            return None
+        import torch
+
+        stem = "depth_anything_v2_small_{}x{}".format(*input_shape[2:])
+        onnx_path = self.cache_dir / f"{stem}.onnx"
+        int8_path = self.cache_dir / f"{stem}_int8.onnx"
+        try:
+            if not int8_path.exists():
+                print("      Exporting depth model to ONNX (first run only)...")
+                torch.onnx.export(
+                    self._depth_module(),
+                    torch.zeros(input_shape),
+                    str(onnx_path),
+                    input_names=["pixel_values"],
+                    output_names=["predicted_depth"],
+                    opset_version=17,
+                )
+                quantize_dynamic(
+                    str(onnx_path), str(int8_path), weight_type=QuantType.QInt8
+                )
+            return ort.InferenceSession(
+                str(int8_path), providers=["CPUExecutionProvider"]
+            )
+        except Exception as e:
+            print(f"      ONNX Runtime unavailable ({e}). Using PyTorch model.")
+            return None
+
     def _create_multi_layers(self):
         """Create multiple depth layers (ONCE)"""
         self.layers = []
@@ -159,32 +413,38 @@ class MultiLayerDepthEngine:
         # Create depth thresholds for each layer
         thresholds = np.linspace(0, 1, self.num_layers + 1)
 
+        # All layer masks from one pass over the depth map: the background
+        # takes depth <= first threshold, the foreground everything above the
+        # last one, middle layers (min, max]
+        masks = np.zeros((self.num_layers,) + self.depth_map.shape, dtype=np.uint8)
+        if self.use_jit:
+            _layer_masks(self.depth_map, thresholds[1:-1], masks)
+        else:
+            layer_index = np.digitize(
+                self.depth_map, thresholds[1:-1], right=True
+            ).astype(np.uint8)
+            for i in range(self.num_layers):
+                np.multiply(layer_index == i, np.uint8(255), out=masks[i])
+
         for i in range(self.num_layers):
             min_depth = thresholds[i]
             max_depth = thresholds[i + 1]
 
-            # Create mask for this depth range
-            if i == 0:  # Background (furthest)
-                mask_array = (self.depth_map <= max_depth).astype(np.uint8) * 255
-            elif i == self.num_layers - 1:  # Foreground (closest)
-                mask_array = (self.depth_map > min_depth).astype(np.uint8) * 255
-            else:  # Middle layers
-                mask_array = (
-                    (self.depth_map > min_depth) & (self.depth_map <= max_depth)
-                ).astype(np.uint8) * 255
+            # Mask for this depth range
+            mask_array = masks[i]
 
             # Smooth edges
-            mask = Image.fromarray(mask_array, mode="L")
-            mask = mask.filter(ImageFilter.GaussianBlur(radius=2))
+            mask_array = cv2.GaussianBlur(
+                mask_array, (0, 0), 2.0, borderType=cv2.BORDER_REPLICATE
+            )
 
-            # Create layer
-            layer = Image.new("RGBA", self.original_image.size, (0, 0, 0, 0))
-            layer.paste(self.original_image, (0, 0))
-            layer.putalpha(mask)
+            # Create layer: the image's colors under this mask
+            layer_array = np.dstack([self.original_rgba[..., :3], mask_array])
 
             self.layers.append(
                 {
-                    "image": layer,
+                    "image": Image.fromarray(layer_array, "RGBA"),
+                    "array": layer_array,
                     "depth_range": (min_depth, max_depth),
                     "name": (
                         f"Layer {i+1}"
@@ -204,21 +464,25 @@ class MultiLayerDepthEngine:
             print("\n      Saving layers to cache...")
             cache_file = self.cache_dir / f"{Path(self.image_path).stem}_layers.json"
 
+            # All layers go into one raw (num_layers, H, W, 4) array so the
+            # next start can memory-map it instead of decoding PNGs
+            array_path = self.cache_dir / f"{Path(self.image_path).stem}_layers.npy"
+            np.save(
+                array_path,
+                np.stack([self._layer_array(layer_data) for layer_data in self.layers]),
+            )
+
             # Save layer metadata
             metadata = {
                 "num_layers": self.num_layers,
                 "image_path": str(self.image_path),
+                "array": str(array_path),
                 "layers": [],
             }
 
-            for i, layer_data in enumerate(self.layers):
-                layer_path = (
-                    self.cache_dir / f"{Path(self.image_path).stem}_layer_{i}.png"
-                )
-                layer_data["image"].save(str(layer_path))
+            for layer_data in self.layers:
                 metadata["layers"].append(
                     {
-                        "path": str(layer_path),
                         "depth_range": layer_data["depth_range"],
                         "name": layer_data["name"],
                     }
@@ -247,12 +511,20 @@ class MultiLayerDepthEngine:
                 print("      Layer count mismatch - will regenerate")
                 return False
 
+            if "array" not in metadata:
+                print("      Old cache format - will regenerate")
+                return False
+
+            # Pages are read from disk as layers are first composited
+            layer_arrays = np.load(metadata["array"], mmap_mode="r")
+
             self.layers = []
-            for layer_meta in metadata["layers"]:
-                layer_image = Image.open(layer_meta["path"])
+            for layer_meta, layer_array in zip(metadata["layers"], layer_arrays):
+                layer_array = np.asarray(layer_array)
                 self.layers.append(
                     {
-                        "image": layer_image,
+                        "image": Image.fromarray(layer_array, "RGBA"),
+                        "array": layer_array,
                         "depth_range": tuple(layer_meta["depth_range"]),
                         "name": layer_meta["name"],
                     }
@@ -267,106 +539,379 @@ class MultiLayerDepthEngine:
     def set_clock_layer(self, layer_index):
         """Set which layer the clock appears at (0=back, num_layers-1=front)"""
         if 0 <= layer_index < self.num_layers:
-            self.clock_layer_index = layer_index
+            # Called from the GUI/tray thread: a frame in progress must not
+            # mix composites from both layer orders
+            with self._frame_lock:
+                self.clock_layer_index = layer_index
+                self._rebuild_composites()
             print(f"Clock layer set to: {self.layers[layer_index]['name']}")
         else:
             print(f"Invalid layer index! Must be 0-{self.num_layers-1}")
 
-    def _get_realtime_clock(self):
+    def _rebuild_composites(self):
+        """
+        Flatten the layers behind and in front of the clock, once
+
+        The layers behind are laid over an opaque copy of the image. Every
+        layer carries the image's own colors, so this only fills the gaps
+        where blurred layer edges don't add up to full coverage, and frames
+        come out opaque without dividing by alpha.
+
+        This also resets the dirty-rect state create_wallpaper_frame keeps
+        (the canvas clock rectangle and the rows patched into each file), so
+        once frames may be rendering it must run under _frame_lock; a frame
+        finishing afterwards would otherwise record its rectangle against
+        the old composites and leave the rest of the canvas stale.
+        """
+        layers = self._premultiplied_layers()
+        before = layers[: self.clock_layer_index + 1]
+        after = layers[self.clock_layer_index + 1 :]
+
+        bg = self.original_rgba.copy()
+        bg[..., 3] = 255
+        self._over_all(bg, before)
+        self._bg_composite = bg
+
+        self._fg_composite = None
+        if len(after):
+            fg = np.zeros_like(bg)
+            self._over_all(fg, after)
+            self._fg_composite = fg
+
+        # Frames only redraw the clock's rectangle on top of this
+        static = bg.copy()
+        if self._fg_composite is not None:
+            self._over(static, self._fg_composite)
+        self._static_composite = static
+        self._clock_rect = None
+        self._saved_rows = {}
+
+    def _over(self, dst, src):
+        """Premultiplied "over" of src onto dst in place (Numba or NumPy)"""
+        if self.use_jit:
+            _over_premultiplied(dst, src)
+        else:
+            _over_premultiplied_numpy(dst, src)
+
+    def _over_all(self, dst, layers):
+        """Composite a stack of premultiplied layers onto dst, back to front"""
+        if self.use_jit:
+            _over_stack(dst, layers)
+        else:
+            for layer in layers:
+                _over_premultiplied_numpy(dst, layer)
+
+    def _get_realtime_clock(self, now=None):
         """Get current time as formatted string"""
-        now = datetime.datetime.now()
-        return now.strftime("%H:%M")
+        if now is None:
+            now = datetime.datetime.now()
+        return now.strftime(self.clock_format)
+
+    def _render_key(self, now):
+        """The clock and date text drawn for the moment `now`"""
+        return self._get_realtime_clock(now), now.strftime(self.date_format)
+
+    def _seconds_until_change(self, now):
+        """How long the text drawn for `now` can stay on screen unchanged"""
+        minute = now.replace(second=0, microsecond=0)
+        if self._render_key(minute) == self._render_key(minute.replace(second=59)):
+            # The formats show no seconds: nothing changes until the next minute
+            return 60 - now.second - now.microsecond / 1e6
+        return self.update_interval
 
     def create_wallpaper_frame(self):
-        """Create wallpaper with current time (FAST - no AI processing!)"""
-        width, height = self.original_image.size
-        current_time = self._get_realtime_clock()
+        """
+        Create wallpaper with current time (FAST - no AI processing!)
 
-        # Create canvas
-        canvas = Image.new("RGBA", (width, height), (0, 0, 0, 0))
+        The returned image is the engine's reusable canvas and is redrawn by
+        the next call; copy it to keep it.
+        """
+        return self._render_frame()[0]
 
-        # Composite layers BEFORE clock layer
-        for i in range(self.clock_layer_index + 1):
-            canvas.alpha_composite(self.layers[i]["image"], (0, 0))
+    def _render_frame(self):
+        """Render and save a frame; returns (canvas, path it was saved to)"""
+        now = datetime.datetime.now()
+        current_time, date_text = self._render_key(now)
+        text_tile = self._render_clock_tile(current_time, date_text)
+
+        # The GUI and the update thread may both ask for a frame, and they
+        # share the buffers
+        with self._frame_lock:
+            if self._bg_composite is None:
+                self._rebuild_composites()
+            canvas = self._frame_buffers()
+            canvas_array = self._canvas_array
+
+            # Outside the clock the frame never changes: put the static frame
+            # back where the last clock was, then redraw only the new one
+            if self._clock_rect is None:
+                np.copyto(canvas_array, self._static_composite)
+            else:
+                canvas_array[self._clock_rect] = self._static_composite[self._clock_rect]
+
+            # Layers BEFORE the clock, the clock, then those AFTER it; each
+            # side is pre-flattened
+            rect = np.s_[0:0, 0:0]
+            if text_tile is not None:
+                tile, (left, top) = text_tile
+                rect = np.s_[top : top + tile.shape[0], left : left + tile.shape[1]]
+                region = canvas_array[rect]
+                region[...] = self._bg_composite[rect]
+                self._over(region, tile)
+                if self._fg_composite is not None:
+                    self._over(region, self._fg_composite[rect])
+            self._clock_rect = rect
+
+            path = self._wallpaper_paths[self._buffer_index]
+            self._wait_for_wallpaper_set(path)
+            self._save_wallpaper(path, (rect[0].start, rect[0].stop))
+            self.wallpaper_path = path
+            self._buffer_index ^= 1
+            self._last_render_key = (current_time, date_text)
+
+        return canvas, path
+
+    def _frame_buffers(self):
+        """
+        The RGBA canvas (and RGB copy for saving) reused across frames,
+        allocated on first use and again if the image size changes
 
-        # Create and add clock layer
-        text_layer = Image.new("RGBA", (width, height), (0, 0, 0, 0))
-        draw = ImageDraw.Draw(text_layer)
+        The canvas image wraps _canvas_array, so drawing into the array
+        draws into the image.
+        """
+        height, width = self.original_rgba.shape[:2]
+        size = (width, height)
+        if self._canvas is None or self._canvas.size != size:
+            self._canvas_array = np.zeros((height, width, 4), dtype=np.uint8)
+            self._canvas = Image.fromarray(self._canvas_array, "RGBA")
+            self._rgb_canvas = Image.new("RGB", size)
+            self._clock_rect = None
+            self._saved_rows = {}
+        return self._canvas
+
+    def _save_wallpaper(self, path, rows):
+        """
+        Write the canvas to `path`; `rows` is the (top, bottom) span the
+        clock was drawn in
 
-        # Draw time
-        text_bbox = draw.textbbox((0, 0), current_time, font=self.font)
+        If the file is a 24-bit BMP holding an earlier frame of this canvas,
+        only the rows that differ (its old clock rows and the new ones) are
+        rewritten in place. BMP stores rows bottom-up, so they form one
+        contiguous block.
+        """
+        key = str(path)
+        old_rows = self._saved_rows.pop(key, None)
+        if old_rows is not None and os.path.exists(key):
+            spans = [span for span in (old_rows, rows) if span[1] > span[0]]
+            if not spans:
+                self._saved_rows[key] = rows
+                return
+            top = min(span[0] for span in spans)
+            bottom = max(span[1] for span in spans)
+
+            height, width = self._canvas_array.shape[:2]
+            stride = (width * 3 + 3) & ~3
+            with open(key, "r+b") as f:
+                header = f.read(30)
+                if (
+                    header[:2] == b"BM"
+                    and int.from_bytes(header[18:22], "little", signed=True) == width
+                    and int.from_bytes(header[22:26], "little", signed=True) == height
+                    and int.from_bytes(header[28:30], "little") == 24
+                ):
+                    block = np.zeros((bottom - top, stride), dtype=np.uint8)
+                    block[:, : width * 3] = self._canvas_array[
+                        top:bottom, :, 2::-1
+                    ].reshape(bottom - top, -1)
+                    offset = int.from_bytes(header[10:14], "little")
+                    f.seek(offset + (height - bottom) * stride)
+                    f.write(block[::-1].tobytes())
+                    self._saved_rows[key] = rows
+                    return
+
+        # Pasting RGBA into the RGB buffer drops alpha in place
+        self._rgb_canvas.paste(self._canvas, (0, 0))
+        self._rgb_canvas.save(key)
+        self._saved_rows[key] = rows
+
+    def _text_bbox(self, font, text):
+        """font.getbbox(text), memoized: a clock only ever shows 1440 times"""
+        key = (font, text)
+        if key not in self._bboxes:
+            self._bboxes[key] = font.getbbox(text)
+        return self._bboxes[key]
+
+    def _render_clock_tile(self, current_time, date_text):
+        """
+        Draw the time, its shadow and the date into a tile covering only
+        their bounding box
+
+        Returns (premultiplied RGBA array, (x, y)) or None if nothing lands
+        on the canvas.
+        """
+        height, width = self.original_rgba.shape[:2]
+
+        # Time position
+        text_bbox = self._text_bbox(self.font, current_time)
         text_width = text_bbox[2] - text_bbox[0]
         position = ((width - text_width) // 2, int(height * 0.25))
+        shadow_offset = 4
+
+        # Date position
+        date_font = self.date_font
+        date_bbox = self._text_bbox(date_font, date_text)
+        date_width = date_bbox[2] - date_bbox[0]
+        date_position = ((width - date_width) // 2, position[1] - int(height * 0.05))
+
+        # Tile bounds, clipped to the canvas
+        left = max(min(position[0] + text_bbox[0], date_position[0] + date_bbox[0]), 0)
+        top = max(min(position[1] + text_bbox[1], date_position[1] + date_bbox[1]), 0)
+        right = min(
+            max(position[0] + text_bbox[2] + shadow_offset, date_position[0] + date_bbox[2]),
+            width,
+        )
+        bottom = min(
+            max(position[1] + text_bbox[3] + shadow_offset, date_position[1] + date_bbox[3]),
+            height,
+        )
+        if right <= left or bottom <= top:
+            return None
+
+        tile = Image.new("RGBA", (right - left, bottom - top), (0, 0, 0, 0))
+        draw = ImageDraw.Draw(tile)
+        x, y = position[0] - left, position[1] - top
 
         # Shadow
-        shadow_offset = 4
         draw.text(
-            (position[0] + shadow_offset, position[1] + shadow_offset),
+            (x + shadow_offset, y + shadow_offset),
             current_time,
             fill=(0, 0, 0, 120),
             font=self.font,
         )
         # Main text
-        draw.text(position, current_time, fill=(255, 255, 255, 255), font=self.font)
-
-        # Draw date
-        date_text = datetime.datetime.now().strftime("%a %b %d")
-        try:
-            date_font = ImageFont.truetype(self.font.path, int(height * 0.03))
-        except:
-            date_font = self.font
-
-        date_bbox = draw.textbbox((0, 0), date_text, font=date_font)
-        date_width = date_bbox[2] - date_bbox[0]
-        date_position = ((width - date_width) // 2, position[1] - int(height * 0.05))
-        draw.text(date_position, date_text, fill=(255, 255, 255, 200), font=date_font)
-
-        canvas.alpha_composite(text_layer, (0, 0))
+        draw.text((x, y), current_time, fill=(255, 255, 255, 255), font=self.font)
+        # Date
+        draw.text(
+            (date_position[0] - left, date_position[1] - top),
+            date_text,
+            fill=(255, 255, 255, 200),
+            font=date_font,
+        )
+        return _premultiply(np.asarray(tile)), (left, top)
 
-        # Composite layers AFTER clock layer
-        for i in range(self.clock_layer_index + 1, self.num_layers):
-            canvas.alpha_composite(self.layers[i]["image"], (0, 0))
+    def warmup(self):
+        """Compile the JIT kernels now so the first frame doesn't pay for it"""
+        if not self.use_jit:
+            return
+        # Same argument types as create_wallpaper_frame, since numba
+        # compiles per signature
+        dst = np.zeros((2, 2, 4), dtype=np.uint8)
+        src = np.zeros((2, 2, 4), dtype=np.uint8)
+        _over_premultiplied(dst, src)
+        # The clock tile and the foreground's matching slice are composited
+        # into a (non-contiguous) canvas slice
+        _over_premultiplied(dst[:, :1], src[:, :1].copy())
+        _over_premultiplied(dst[:, :1], src[:, :1])
+
+    def _layer_array(self, layer_data):
+        """RGBA array view of a layer, converted once and kept with the layer"""
+        if "array" not in layer_data:
+            layer_data["array"] = np.asarray(layer_data["image"].convert("RGBA"))
+        return layer_data["array"]
+
+    def _premultiplied_layers(self):
+        """
+        All layers premultiplied into one NxHxWx4 array
 
-        # Save
-        canvas.convert("RGB").save(str(self.wallpaper_path), quality=95)
+        Not kept: only a composite rebuild reads it, and at 4K it is as big
+        as the layers themselves.
+        """
+        height, width = self.original_rgba.shape[:2]
+        stack = np.empty((len(self.layers), height, width, 4), dtype=np.uint8)
+        for i, layer_data in enumerate(self.layers):
+            stack[i] = _premultiply(self._layer_array(layer_data))
+        return stack
 
-        return canvas
+    def set_windows_wallpaper(self, image_path, persist=True):
+        """
+        Set image as Windows wallpaper
 
-    def set_windows_wallpaper(self, image_path):
-        """Set image as Windows wallpaper"""
+        With persist=False the registry isn't written and no
+        WM_SETTINGCHANGE is broadcast to every window; the update loop uses
+        that for its periodic refreshes of the wallpaper already set.
+        """
         try:
             abs_path = str(Path(image_path).resolve())
             SPI_SETDESKWALLPAPER = 0x0014
             SPIF_UPDATEINIFILE = 0x01
             SPIF_SENDCHANGE = 0x02
 
+            flags = SPIF_UPDATEINIFILE | SPIF_SENDCHANGE if persist else 0
             result = ctypes.windll.user32.SystemParametersInfoW(
-                SPI_SETDESKWALLPAPER, 0, abs_path, SPIF_UPDATEINIFILE | SPIF_SENDCHANGE
+                SPI_SETDESKWALLPAPER, 0, abs_path, flags
             )
             return result
         except Exception as e:
             print(f"Error setting wallpaper: {e}")
             return False
 
+    def update_wallpaper(self, persist=True):
+        """
+        Render a frame and set it as the wallpaper; returns the saved path
+
+        While the engine runs, the set is queued on the wallpaper worker and
+        this returns once the frame is saved. The update loop, the tray and
+        the GUI all come through here one at a time, so sets happen in
+        render order and the last frame rendered is the one Windows shows.
+        """
+        with self._set_lock:
+            _, path = self._render_frame()
+            self._wait_for_wallpaper_set()
+            if self._wallpaper_executor is None:
+                self._pending_set = None
+                self.set_windows_wallpaper(path, persist)
+            else:
+                self._pending_set = (
+                    path,
+                    self._wallpaper_executor.submit(
+                        self.set_windows_wallpaper, path, persist
+                    ),
+                )
+        return path
+
+    def _wait_for_wallpaper_set(self, path=None):
+        """Block until the queued wallpaper set is done, if it is for `path`"""
+        pending = self._pending_set
+        if pending is not None and (path is None or pending[0] == path):
+            pending[1].result()
+
     def update_loop(self):
         """Main update loop - FAST because no AI processing!"""
         while self.running:
             try:
+                # Skip the render, save and wallpaper call while the text on
+                # screen is still current
+                now = datetime.datetime.now()
+                if self._render_key(now) == self._last_render_key:
+                    self._wake.wait(self._seconds_until_change(now))
+                    continue
+
                 start_time = time.time()
 
-                self.create_wallpaper_frame()
-                self.set_windows_wallpaper(self.wallpaper_path)
+                # Windows picks the frame up on the worker while this thread
+                # waits for and renders the next one into the other file
+                self.update_wallpaper(persist=False)
 
                 elapsed = time.time() - start_time
                 print(
                     f"[{datetime.datetime.now().strftime('%H:%M:%S')}] Wallpaper updated in {elapsed:.2f}s"
                 )
 
-                time.sleep(self.update_interval)
+                self._wake.wait(self.update_interval)
 
             except Exception as e:
                 print(f"Error in update loop: {e}")
-                time.sleep(5)
+                self._wake.wait(5)
 
     def start(self):
         """Start the wallpaper engine"""
@@ -376,10 +921,13 @@ class MultiLayerDepthEngine:
 
         print("\nStarting wallpaper engine...")
         self.running = True
+        self._wake.clear()
+
+        if self._wallpaper_executor is None:
+            self._wallpaper_executor = ThreadPoolExecutor(max_workers=1)
 
         # Create initial wallpaper
-        self.create_wallpaper_frame()
-        self.set_windows_wallpaper(self.wallpaper_path)
+        self.update_wallpaper()
 
         # Start update thread
         self.update_thread = threading.Thread(target=self.update_loop, daemon=True)
@@ -392,17 +940,33 @@ class MultiLayerDepthEngine:
         """Stop the wallpaper engine"""
         print("Stopping engine...")
         self.running = False
+        self._wake.set()
+        # Every wait in the loop ends on _wake, so this returns within one
+        # frame; the executor must outlive the loop's last submit
         if self.update_thread:
-            self.update_thread.join(timeout=2)
+            self.update_thread.join()
+        with self._set_lock:
+            if self._wallpaper_executor is not None:
+                self._wallpaper_executor.shutdown(wait=True)
+                self._wallpaper_executor = None
         print("âœ“ Engine stopped!")
 
     def export_debug_images(self):
         """Export all layers for debugging"""
         print("\nExporting debug images...")
-        for i, layer_data in enumerate(self.layers):
+
+        def save_layer(args):
+            i, layer_data = args
             output_path = self.output_dir / f"layer_{i}_{layer_data['name']}.png"
-            layer_data["image"].save(str(output_path))
-            print(f"  Saved: {output_path}")
+            # Debug dumps don't need max compression
+            layer_data["image"].save(str(output_path), compress_level=1)
+            return output_path
+
+        # PNG encoding releases the GIL, so the layers encode in parallel
+        workers = max(1, min(len(self.layers), os.cpu_count() or 1))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for output_path in executor.map(save_layer, enumerate(self.layers)):
+                print(f"  Saved: {output_path}")
         print("âœ“ Debug export complete!")
 
     def create_tray_icon(self):
@@ -416,15 +980,13 @@ class MultiLayerDepthEngine:
             icon.stop()
 
         def on_update_now(icon, item):
-            self.create_wallpaper_frame()
-            self.set_windows_wallpaper(self.wallpaper_path)
+            self.update_wallpaper()
             print("Wallpaper updated!")
 
         def change_clock_layer(layer_idx):
             def handler(icon, item):
                 self.set_clock_layer(layer_idx)
-                self.create_wallpaper_frame()
-                self.set_windows_wallpaper(self.wallpaper_path)
+                self.update_wallpaper()
 
             return handler
 
@@ -510,9 +1072,8 @@ def main():
         engine.export_debug_images()
         print(f"\nLayers exported to: {engine.output_dir}")
     elif choice == "4":
-        engine.create_wallpaper_frame()
-        engine.set_windows_wallpaper(engine.wallpaper_path)
-        print(f"\nTest wallpaper created: {engine.wallpaper_path}")
+        path = engine.update_wallpaper()
+        print(f"\nTest wallpaper created: {path}")
     else:
         print("Invalid choice!")
 